@@ -1,21 +1,29 @@
 import os
-from firebase_config import firebase_admin
-from flask import Flask, request, jsonify, send_file, send_from_directory, g
+import json
+from io import BytesIO
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, g, stream_with_context
 from flask_cors import CORS
-from firebase_admin import auth
-from auth import firebase_required
+from auth import firebase_required, verify_token, auth_stats, SIGNING_KEYS
 from werkzeug.utils import secure_filename
-from flask_caching import Cache
 from PIL import Image
 from services.image_translate import translate_image_file, correct_image_orientation
-from services.audio_translate import translate_audio_file, extract_text_from_audio, SpeechRecognitionError
-from services.text_translate import translate_input_text
-from utils.hashers import generate_image_cache_key, generate_audio_cache_key, generate_text_cache_key
+from services.audio_translate import translate_audio_file, extract_text_from_audio, stream_audio_transcripts, SpeechRecognitionError
+from services.text_translate import translate_input_text, translate_input_text_stream, parse_composite, resolve_profile, is_partial
+from services.image_workers import IMAGE_POOL
+from services.image_encoding import resolve_encoding, encoding_tag, output_extension
+from services.batching import get_batching_stats
+from services.openai_llm import openai_health, openai_provider
+from services.anthropic_llm import anthropic_health, anthropic_provider
+from services.line_cache import LINE_CACHE
+from services.jobs import JOB_QUEUE, JobQueueFull
+from utils.cache_store import get_cache, CACHE_TTL
+from utils.blob_store import BlobStore, blob_extension
+from utils.hashers import generate_image_cache_key, generate_audio_cache_key, generate_text_cache_key, read_upload, cache_model_id
 from utils.lang_detector import get_lang, image_lang_detector
 import logging
-import time
 from models.models_registry import load_models
-from send2trash import send2trash
+from models.asr_registry import load_asr_models
+from services.asr import get_asr_engine
 from openai import OpenAIError
 from anthropic import APIError
 
@@ -26,11 +34,20 @@ CORS(app)
 UPLOAD_FOLDER = "./uploads"
 ORIGINAL_DIR = "./uploads/original"
 TRANSLATED_DIR = "./uploads/translate"
+ORIGINAL_AUDIO_DIR = "./uploads/audio/original"
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["ORIGINAL_DIR"] = ORIGINAL_DIR
 app.config["TRANSLATED_DIR"] = TRANSLATED_DIR
 
-cache = Cache(app, config={"CACHE_TYPE": "SimpleCache"})
+# Result URLs never change content, so clients and proxies may keep them.
+RESULT_MAX_AGE = 365 * 24 * 3600
+# Streamed audio is checked against src_lang once this much text is recognized.
+AUDIO_LANG_MIN_CHARS = int(os.getenv("AUDIO_LANG_MIN_CHARS", "40"))
+
+cache = get_cache()
+original_store = BlobStore(ORIGINAL_DIR)
+result_store = BlobStore(TRANSLATED_DIR)
+audio_store = BlobStore(ORIGINAL_AUDIO_DIR)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -40,7 +57,19 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 logger.info("Starting the app...")
+# Fork the image workers before the models load, so they do not inherit them.
+IMAGE_POOL.warm_up()
 MODEL_REGISTRY = load_models()
+ASR_MODEL_REGISTRY = load_asr_models()
+
+# Old uploads and results are removed in the background by age and total size.
+for store in (original_store, result_store, audio_store):
+    store.start_sweeper()
+
+# Prefetch the token signing keys. Like the sweepers, the refresh thread
+# starts only now, after the image workers have been forked.
+if SIGNING_KEYS is not None:
+    SIGNING_KEYS.start()
 
 status_map = {
     "authentication_error": 401,
@@ -49,12 +78,20 @@ status_map = {
     "api_error": 503,
 }
 
+def describe_job_error(e):
+    if isinstance(e, (OpenAIError, APIError)):
+        code, _, message = e.args[0].partition(": ")
+        return status_map.get(code, 500), message.strip()
+    if isinstance(e, (ValueError, SpeechRecognitionError)):
+        return 400, str(e)
+    return 500, f"Internal server error: {e}"
+
+
+JOB_QUEUE.describe_error = describe_job_error
+
+
 def verify_firebase_token(token):
-    try:
-        decoded_token = auth.verify_id_token(token)
-        return decoded_token
-    except Exception as e:
-        return None
+    return verify_token(token)
 
 @app.errorhandler(OpenAIError)
 def handle_openai_error(e):
@@ -73,6 +110,34 @@ def home():
     return "Backend is set up and running!"
 
 
+@app.route("/metrics", methods=["GET"])
+@firebase_required
+def metrics():
+    return jsonify({
+        "auth": auth_stats(),
+        "batching": get_batching_stats(),
+        "models": MODEL_REGISTRY.stats(),
+        "asr_models": ASR_MODEL_REGISTRY.stats(),
+        "line_cache": LINE_CACHE.stats(),
+        "jobs": JOB_QUEUE.stats(),
+        "image_workers": IMAGE_POOL.stats(),
+        "cache": cache.stats(),
+        "storage": {
+            "original": original_store.stats(),
+            "translate": result_store.stats(),
+            "audio": audio_store.stats(),
+        },
+        "llm_health": {
+            "openai": openai_health.stats(),
+            "anthropic": anthropic_health.stats(),
+        },
+        "llm_providers": {
+            "openai": openai_provider.stats(),
+            "anthropic": anthropic_provider.stats(),
+        },
+    }), 200
+
+
 @app.route("/protected", methods=["GET"])
 @firebase_required
 def protected():
@@ -86,7 +151,78 @@ def protected():
 
 @app.route("/uploads/translate/<path:filename>")
 def serve_translated(filename):
-    return send_from_directory("uploads/translate", filename)
+    if not result_store.exists(filename):
+        return jsonify({"error": "Not found"}), 404
+    digest = os.path.splitext(filename)[0].rsplit("/", 1)[-1]
+    response = send_from_directory(
+        TRANSLATED_DIR, filename, etag=digest, max_age=RESULT_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def result_name(url):
+    return url.split("?")[0].split("/uploads/translate/", 1)[-1]
+
+
+def cached_images_exist(response):
+    # The cache can outlive the result files, which the sweeper removes by age.
+    for url_key in ("original_image_url", "white_image_url"):
+        if not response.get(url_key):
+            continue
+        name = result_name(response[url_key])
+        if not result_store.exists(name):
+            return False
+        result_store.touch(name)
+    return True
+
+
+def wants_async():
+    return request.form.get("async", "0") == "1"
+
+
+def submit_job(kind, fn):
+    try:
+        job_id = JOB_QUEUE.submit(
+            kind, fn, owner=g.user.get("uid"),
+            callback_url=request.form.get("callback_url"))
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": request.url_root.rstrip("/") + f"/jobs/{job_id}",
+    }), 202
+
+
+def run_image_translation(image_bytes, image_digest, filename, src_lang, tgt_lang, composite, profile, cache_key,
+                          public_base, encoding, with_white):
+    original_store.put(image_bytes, blob_extension(filename), image_digest)
+
+    img = Image.open(BytesIO(image_bytes))
+    img = correct_image_orientation(img).convert("RGB")
+
+    ocr_result = IMAGE_POOL.ocr(img)
+    detected = image_lang_detector(ocr_result)
+
+    org_io, wht_io, partial = translate_image_file(
+        img, src_lang, tgt_lang, composite, ocr_result, profile, encoding, with_white)
+
+    ext = output_extension(encoding)
+    org_name = result_store.put(org_io.getbuffer(), ext)
+    wht_name = result_store.put(wht_io.getbuffer(), ext) if wht_io is not None else None
+
+    response = {
+        "original_image_url": f"{public_base}/{org_name}",
+        "white_image_url":    f"{public_base}/{wht_name}" if wht_name else None,
+        "detected_lang": detected
+    }
+
+    if not partial:
+        cache.set(cache_key, response, timeout=CACHE_TTL["image"])
+    return response
 
 
 @app.route("/translate-image", methods=["POST"])
@@ -99,57 +235,35 @@ def translate_image():
         file = request.files["file"]
         src_lang = request.form.get("src_lang", "hr")
         tgt_lang = request.form.get("tgt_lang", "en")
-        composite = request.form.get("composite", "ml_facebook/m2m100_1.2B")
-
-        original_dir = "./uploads/original"
-        os.makedirs(original_dir, exist_ok=True)
-        base, ext = os.path.splitext(file.filename)
-        original_path = os.path.join(original_dir, file.filename)
-        file.save(original_path)
-
-        img = Image.open(original_path)
-        img = correct_image_orientation(img)
-
-        detected = image_lang_detector(img)
-
-        engine, model_name = composite.split('_:_')
-        if engine == "ml":
-            model_name = model_name.split("/")[1]
-
+        composite = request.form.get("composite", "ml_:_facebook/m2m100_1.2B")
+        profile = resolve_profile(request.form.get("profile"))
+        encoding = resolve_encoding(
+            request.form.get("format"), request.form.get("effort"),
+            request.form.get("quality"), request.form.get("max_dimension"))
+        with_white = request.form.get("white", "1") == "1"
+
+        engine, model_name, backend = parse_composite(composite)
+        model_id = cache_model_id(engine, model_name, backend, profile)
+        output_id = f"{model_id}-{encoding_tag(encoding)}"
+
+        image_bytes, image_digest = read_upload(file)
         cache_key = generate_image_cache_key(
-            original_path, src_lang, tgt_lang, model_name)
+            image_digest, src_lang, tgt_lang, output_id if with_white else f"{output_id}-nowht")
         cached_translation = cache.get(cache_key)
-        if cached_translation:
+        if cached_translation and cached_images_exist(cached_translation):
             logger.info(f"\nCache: {cached_translation}\n")
+            if wants_async():
+                # Still answered as a job, so callback clients hear about it.
+                return submit_job("image", lambda: cached_translation)
             return jsonify(cached_translation)
 
-        org_io, wht_io = translate_image_file(
-            img, src_lang, tgt_lang, composite)
-
-        out_dir = "./uploads/translate"
-        os.makedirs(out_dir, exist_ok=True)
-        # org_name = f"{base}_translated_org_{src_lang}-{tgt_lang}-{engine}-{model_name}.png"
-        # wht_name = f"{base}_translated_wht_{src_lang}-{tgt_lang}-{engine}-{model_name}.png"
-        org_name = f"{base}_translated_org_{src_lang}-{tgt_lang}-{engine}-{model_name}.webp"
-        wht_name = f"{base}_translated_wht_{src_lang}-{tgt_lang}-{engine}-{model_name}.webp"
-        org_path = os.path.join(out_dir, org_name)
-        wht_path = os.path.join(out_dir, wht_name)
-
-        with open(org_path, "wb") as f:
-            f.write(org_io.getbuffer())
-        with open(wht_path, "wb") as f:
-            f.write(wht_io.getbuffer())
-
-        timestamp = int(time.time())
         public_base = request.url_root.rstrip("/") + "/uploads/translate"
-        response = {
-            "original_image_url": f"{public_base}/{org_name}?v={timestamp}",
-            "white_image_url":    f"{public_base}/{wht_name}?v={timestamp}",
-            "detected_lang": detected
-        }
+        args = (image_bytes, image_digest, file.filename, src_lang, tgt_lang, composite,
+                profile, cache_key, public_base, encoding, with_white)
+        if wants_async():
+            return submit_job("image", lambda: run_image_translation(*args))
 
-        cache.set(cache_key, response, timeout=600)
-        return jsonify(response)
+        return jsonify(run_image_translation(*args))
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -157,6 +271,24 @@ def translate_image():
         return jsonify({"error": f"Internal server error: {e}"}), 500
 
 
+def run_audio_translation(audio_bytes, audio_digest, filename, src_lang, tgt_lang, composite, profile, cache_key,
+                          force_flag, asr_engine):
+    audio_store.put(audio_bytes, blob_extension(filename), audio_digest)
+
+    text = extract_text_from_audio(audio_bytes, src_lang, asr_engine)
+    detected = get_lang(text)
+
+    if not force_flag and detected != src_lang:
+        return {"translation": "", "detected_lang": detected}
+
+    translated_audio_text = translate_audio_file(
+        text, src_lang, tgt_lang, composite, profile)
+    response = {"translation": translated_audio_text, "detected_lang": detected}
+    if not is_partial(translated_audio_text):
+        cache.set(cache_key, response, timeout=CACHE_TTL["audio"])
+    return response
+
+
 @app.route("/translate-audio", methods=["POST", "GET"])
 @firebase_required
 def translate_audio():
@@ -167,47 +299,45 @@ def translate_audio():
         file = request.files["file"]
         src_lang = request.form.get("src_lang", "hr")
         tgt_lang = request.form.get("tgt_lang", "en")
-        composite = request.form.get("composite", "ml_facebook/m2m100_1.2B")
+        composite = request.form.get("composite", "ml_:_facebook/m2m100_1.2B")
         force_flag = request.form.get("force", "0") == "1"
+        profile = resolve_profile(request.form.get("profile"))
+        asr_engine = get_asr_engine(request.form.get("asr")).name
 
-        original_audio_dir = "./uploads/audio/original"
-        os.makedirs(original_audio_dir, exist_ok=True)
-        base, ext = os.path.splitext(file.filename)
-        original_audio_filename = f"{base}{ext}"
-        original_audio_path = os.path.join(
-            original_audio_dir, original_audio_filename)
-        file.save(original_audio_path)
-
-        audio_file = original_audio_path
-        text = extract_text_from_audio(audio_file, src_lang)
-        detected = get_lang(text)
-
-        engine, model_name = composite.split('_:_')
-        if engine == "ml":
-            model_name = model_name.split("/")[1]
+        engine, model_name, backend = parse_composite(composite)
+        model_id = cache_model_id(engine, model_name, backend, profile)
 
+        audio_bytes, audio_digest = read_upload(file)
         cache_key = generate_audio_cache_key(
-            original_audio_path, src_lang, tgt_lang, model_name)
-
+            audio_digest, src_lang, tgt_lang, f"{model_id}-{asr_engine.replace('_:_', '-')}")
         cached_audio_translation = cache.get(cache_key)
-
         if cached_audio_translation:
             logger.info(
                 f"\nCache: {cached_audio_translation}\n")
-            return jsonify({"translation": cached_audio_translation, "detected_lang": detected}), 200
+            if wants_async():
+                return submit_job("audio", lambda: cached_audio_translation)
+            return jsonify(cached_audio_translation), 200
 
-        if not force_flag and detected != src_lang:
-            return jsonify({"translation": "", "detected_lang": detected}), 200
+        args = (audio_bytes, audio_digest, file.filename, src_lang, tgt_lang, composite,
+                profile, cache_key, force_flag, asr_engine)
+        if wants_async():
+            return submit_job("audio", lambda: run_audio_translation(*args))
 
-        translated_audio_text = translate_audio_file(
-            text, src_lang, tgt_lang, composite)
-        cache.set(cache_key, translated_audio_text, timeout=600)
-        return jsonify({"translation": translated_audio_text, "detected_lang": detected}), 200
+        return jsonify(run_audio_translation(*args)), 200
 
-    except SpeechRecognitionError as e:
+    except (SpeechRecognitionError, ValueError) as e:
         return jsonify({"error": str(e)}), 400
 
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+@firebase_required
+def job_status(job_id):
+    job = JOB_QUEUE.get(job_id, owner=g.user.get("uid"))
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
 @app.route("/translate-text", methods=["POST", "GET"])
 @firebase_required
 def translate_text():
@@ -222,51 +352,187 @@ def translate_text():
     tgt_lang = data.get("tgt_lang", "en")
     composite = data.get("composite", "ml_:_facebook/m2m100_1.2B")
     force_flag = data.get("force", "0")
+    try:
+        profile = resolve_profile(data.get("profile"))
+        engine, model_name, backend = parse_composite(composite)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    detected = get_lang(text)
-
-    engine, model_name = composite.split('_:_')
-    if engine == "ml":
-        model_name = model_name.split("/")[1]
+    model_id = cache_model_id(engine, model_name, backend, profile)
 
-    cache_key = generate_text_cache_key(text, src_lang, tgt_lang, model_name)
+    cache_key = generate_text_cache_key(text, src_lang, tgt_lang, model_id)
     cached_translation = cache.get(cache_key)
     if cached_translation:
         logger.info(f"\nCache: {cached_translation}\n")
-        return jsonify({"translation": cached_translation, "detected_lang": detected}), 200
+        return jsonify(cached_translation), 200
+
+    detected = get_lang(text)
 
     if not force_flag and detected != src_lang:
         return jsonify({"translation": "", "detected_lang": detected}), 200
 
     translated_text = translate_input_text(
-        text, src_lang, tgt_lang, composite)
-    cache.set(cache_key, translated_text, timeout=600)
-    return jsonify({"translation": translated_text, "detected_lang": detected}), 200
+        text, src_lang, tgt_lang, composite, profile)
+    response = {"translation": translated_text, "detected_lang": detected}
+    if not is_partial(translated_text):
+        cache.set(cache_key, response, timeout=CACHE_TTL["text"])
+    return jsonify(response), 200
 
 
-def clear_upload_folders():
+def sse_event(payload, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
-    folders = [
-        ORIGINAL_DIR,
-        TRANSLATED_DIR,
-        "./uploads/audio/original", "./uploads/audio/WAV",
-    ]
-    for base in folders:
-        if not os.path.isdir(base):
-            continue
 
-        for root, dirs, files in os.walk(base):
-            for fname in files:
-                path = os.path.join(root, fname)
-                try:
-                    send2trash(path)
-                    logger.info(f"Trashed file: {path}")
-                except Exception as e:
-                    logger.warning(f"Failed to send {path} to trash: {e}")
+def sse_response(events):
+    return Response(stream_with_context(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
+@app.route("/translate-text/stream", methods=["POST"])
+@firebase_required
+def translate_text_stream():
+    data = request.get_json()
+
+    if not data or "text" not in data:
+        return jsonify({"error": "No text provided"}), 400
+
+    text = data.get("text")
+    src_lang = data.get("src_lang", "hr")
+    tgt_lang = data.get("tgt_lang", "en")
+    composite = data.get("composite", "ml_:_facebook/m2m100_1.2B")
+    force_flag = data.get("force", "0")
+    try:
+        profile = resolve_profile(data.get("profile"))
+        engine, model_name, backend = parse_composite(composite)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    model_id = cache_model_id(engine, model_name, backend, profile)
+
+    cache_key = generate_text_cache_key(text, src_lang, tgt_lang, model_id)
+    cached_translation = cache.get(cache_key)
+    if cached_translation:
+        logger.info(f"\nCache: {cached_translation}\n")
+        return sse_response(iter([sse_event({**cached_translation, "done": True})]))
+
+    detected = get_lang(text)
+
+    if not force_flag and detected != src_lang:
+        return sse_response(iter([sse_event({"translation": "", "detected_lang": detected, "done": True})]))
+
+    def events():
+        parts = []
+        try:
+            for delta in translate_input_text_stream(text, src_lang, tgt_lang, composite, profile):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+        except (OpenAIError, APIError, ValueError) as e:
+            code, _, message = str(e.args[0]).partition(": ")
+            yield sse_event({"error": message.strip() or code, "status": status_map.get(code, 500)}, event="error")
+            return
+        except Exception as e:
+            logger.exception("Streaming translation failed")
+            yield sse_event({"error": f"Internal server error: {e}", "status": 500}, event="error")
+            return
+
+        response = {"translation": "".join(parts), "detected_lang": detected}
+        if not any(map(is_partial, parts)):
+            cache.set(cache_key, response, timeout=CACHE_TTL["text"])
+        yield sse_event({**response, "done": True})
+
+    return sse_response(events())
+
+
+@app.route("/translate-audio/stream", methods=["POST"])
+@firebase_required
+def translate_audio_stream():
+    if "file" not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    file = request.files["file"]
+    src_lang = request.form.get("src_lang", "hr")
+    tgt_lang = request.form.get("tgt_lang", "en")
+    composite = request.form.get("composite", "ml_:_facebook/m2m100_1.2B")
+    force_flag = request.form.get("force", "0") == "1"
+    try:
+        profile = resolve_profile(request.form.get("profile"))
+        asr_engine = get_asr_engine(request.form.get("asr")).name
+        engine, model_name, backend = parse_composite(composite)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    model_id = cache_model_id(engine, model_name, backend, profile)
+
+    audio_bytes, audio_digest = read_upload(file)
+    cache_key = generate_audio_cache_key(
+        audio_digest, src_lang, tgt_lang, f"{model_id}-{asr_engine.replace('_:_', '-')}")
+    cached_audio_translation = cache.get(cache_key)
+    if cached_audio_translation:
+        logger.info(f"\nCache: {cached_audio_translation}\n")
+        return sse_response(iter([sse_event({**cached_audio_translation, "done": True})]))
+
+    audio_store.put(audio_bytes, blob_extension(file.filename), audio_digest)
+
+    def events():
+        texts = []
+        translations = []
+        held = []
+        detected = None
+
+        def translated(segments):
+            for segment in segments:
+                translation = translate_audio_file(segment["text"], src_lang, tgt_lang, composite, profile)
+                translations.append(translation)
+                yield sse_event({**segment, "translation": translation})
+
+        try:
+            for segment in stream_audio_transcripts(audio_bytes, src_lang, asr_engine):
+                texts.append(segment["text"])
+                if force_flag or detected is not None:
+                    yield from translated([segment])
+                    continue
+                # Hold segments back, untranslated, until there is enough text for
+                # a reliable language check; a single word is easily misdetected.
+                held.append(segment)
+                if len(" ".join(texts)) < AUDIO_LANG_MIN_CHARS:
+                    continue
+                detected = get_lang(" ".join(texts))
+                if detected != src_lang:
+                    yield sse_event({"translation": "", "detected_lang": detected, "done": True})
+                    return
+                yield from translated(held)
+
+            if not texts:
+                yield sse_event({"error": "Could not understand the audio.", "status": 400}, event="error")
+                return
+
+            if detected is None:
+                # Short recording, or force=1: decide on everything that was said.
+                detected = get_lang(" ".join(texts))
+                if not force_flag and detected != src_lang:
+                    yield sse_event({"translation": "", "detected_lang": detected, "done": True})
+                    return
+                yield from translated(held)
+        except SpeechRecognitionError as e:
+            yield sse_event({"error": str(e), "status": 400}, event="error")
+            return
+        except (OpenAIError, APIError, ValueError) as e:
+            code, _, message = str(e.args[0]).partition(": ")
+            yield sse_event({"error": message.strip() or code, "status": status_map.get(code, 500)}, event="error")
+            return
+        except Exception as e:
+            logger.exception("Streaming translation failed")
+            yield sse_event({"error": f"Internal server error: {e}", "status": 500}, event="error")
+            return
+
+        response = {"translation": " ".join(translations), "detected_lang": detected}
+        if not any(map(is_partial, translations)):
+            cache.set(cache_key, response, timeout=CACHE_TTL["audio"])
+        yield sse_event({**response, "done": True})
+
+    return sse_response(events())
 
-clear_upload_folders()
 
 if __name__ == "__main__":
     app.run(debug=True, host="localhost", port=5000)
@@ -1,7 +1,258 @@
 # backend/auth.py
+import os
+import json
+import re
+import threading
+import time
+import urllib.request
+import logging
+from collections import OrderedDict
 from functools import wraps
 from flask import request, jsonify, g
-from firebase_config import auth as firebase_auth  # your firebase_admin.auth
+from utils.hashers import generate_hash
+
+logger = logging.getLogger(__name__)
+
+# firebase: firebase_admin.verify_id_token, jwt: local PyJWT verification
+# against Google's signing keys, test: tokens signed with a local key.
+AUTH_MODE = os.getenv("AUTH_MODE", "jwt")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CLOCK_SKEW = int(os.getenv("AUTH_CLOCK_SKEW", "30"))
+FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "./firebase-adminsdk.json")
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
+GOOGLE_CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com")
+AUTH_TEST_KEY = os.getenv("AUTH_TEST_KEY")
+AUTH_TEST_PROJECT_ID = "translator-test"
+TEST_KEY_ID = "test"
+
+
+class TokenCache:
+    # Verified claims keyed by a hash of the token, dropped once the token expires.
+    def __init__(self, max_size=AUTH_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, claims):
+        with self._lock:
+            self._entries[key] = (claims, claims["exp"])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class GoogleSigningKeys:
+    # Prefetches Google's token signing certificates and refreshes them in
+    # the background before the Cache-Control max-age runs out.
+    def __init__(self, url=GOOGLE_CERTS_URL):
+        self.url = url
+        self.keys = {}
+        self.expires_at = 0
+        self.fetched_at = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._refresh_loop, name="auth-keys", daemon=True)
+                self._thread.start()
+
+    def _fetch(self):
+        from cryptography.x509 import load_pem_x509_certificate
+        with urllib.request.urlopen(self.url, timeout=10) as response:
+            certs = json.loads(response.read())
+            match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        keys = {kid: load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+                for kid, pem in certs.items()}
+        max_age = int(match.group(1)) if match else 3600
+        with self._lock:
+            self.keys = keys
+            self.fetched_at = time.time()
+            self.expires_at = self.fetched_at + max_age
+            self.refreshes += 1
+        self._loaded.set()
+        return max_age
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                max_age = self._fetch()
+                delay = max(60, max_age - 300)
+            except Exception as e:
+                logger.warning(f"Fetching token signing keys failed: {e}")
+                delay = 30
+            time.sleep(delay)
+
+    def get(self, kid):
+        self.start()
+        self._loaded.wait(timeout=10)
+        with self._lock:
+            key = self.keys.get(kid)
+        if key is None and self._loaded.is_set() and time.time() - self.fetched_at > 60:
+            # Google rotated keys before our refresh; fetch once more (at most
+            # once a minute, so unknown key ids cannot flood the endpoint).
+            try:
+                self._fetch()
+            except Exception as e:
+                logger.warning(f"Fetching token signing keys failed: {e}")
+            with self._lock:
+                key = self.keys.get(kid)
+        return key
+
+    def stats(self):
+        with self._lock:
+            return {"keys": len(self.keys), "expires_at": self.expires_at, "refreshes": self.refreshes}
+
+
+class LocalSigningKey:
+    # Stands in for Firebase in local runs and tests: tokens are signed and
+    # verified with one RSA key, from AUTH_TEST_KEY (PEM) or generated at startup.
+    def __init__(self, path=AUTH_TEST_KEY):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        if path:
+            with open(path, "rb") as f:
+                self.private_key = serialization.load_pem_private_key(f.read(), password=None)
+        else:
+            self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.public_key = self.private_key.public_key()
+
+    def start(self):
+        pass
+
+    def get(self, kid):
+        return self.public_key if kid == TEST_KEY_ID else None
+
+    def stats(self):
+        return {"keys": 1, "mode": "test"}
+
+
+def _credentials_project_id():
+    try:
+        with open(FIREBASE_CREDENTIALS) as f:
+            return json.load(f).get("project_id")
+    except (OSError, ValueError):
+        return None
+
+
+def project_id():
+    if AUTH_MODE == "test":
+        return AUTH_TEST_PROJECT_ID
+    return FIREBASE_PROJECT_ID or _credentials_project_id()
+
+
+if AUTH_MODE == "test":
+    SIGNING_KEYS = LocalSigningKey()
+elif AUTH_MODE == "jwt":
+    # Not started here: app.py starts the refresher after forking its image
+    # workers, and get() starts it on first use otherwise.
+    SIGNING_KEYS = GoogleSigningKeys()
+else:
+    SIGNING_KEYS = None
+
+TOKEN_CACHE = TokenCache()
+
+
+def decode_token(token):
+    # Same checks as firebase_admin.auth.verify_id_token, done locally.
+    import jwt
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") != "RS256":
+        raise ValueError("Token is not signed with RS256.")
+    key = SIGNING_KEYS.get(header.get("kid"))
+    if key is None:
+        raise ValueError("Token is signed with an unknown key.")
+
+    project = project_id()
+    claims = jwt.decode(
+        token, key, algorithms=["RS256"], audience=project,
+        issuer=f"https://securetoken.google.com/{project}",
+        leeway=AUTH_CLOCK_SKEW, options={"require": ["exp", "iat", "sub"]})
+    if not claims["sub"] or len(claims["sub"]) > 128:
+        raise ValueError("Token has an invalid subject.")
+    if claims.get("auth_time", 0) > time.time() + AUTH_CLOCK_SKEW:
+        raise ValueError("Token has an auth_time in the future.")
+    claims["uid"] = claims["sub"]
+    return claims
+
+
+def _verify_uncached(token):
+    if AUTH_MODE == "firebase":
+        from firebase_config import auth as firebase_auth
+        return firebase_auth.verify_id_token(token)
+    return decode_token(token)
+
+
+def verify_token(token):
+    # Returns the token claims, or None if the token is not valid.
+    key = generate_hash(token.encode("utf-8"))
+    claims = TOKEN_CACHE.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = _verify_uncached(token)
+    except Exception as e:
+        logger.info(f"Token verification failed: {e}")
+        return None
+    TOKEN_CACHE.set(key, claims)
+    return claims
+
+
+def issue_test_token(uid="test-user", expires_in=3600, **claims):
+    if AUTH_MODE != "test":
+        raise ValueError("Test tokens are only available with AUTH_MODE=test.")
+    import jwt
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{AUTH_TEST_PROJECT_ID}",
+        "aud": AUTH_TEST_PROJECT_ID,
+        "sub": uid,
+        "user_id": uid,
+        "iat": now,
+        "auth_time": now,
+        "exp": now + expires_in,
+        **claims,
+    }
+    return jwt.encode(payload, SIGNING_KEYS.private_key, algorithm="RS256",
+                      headers={"kid": TEST_KEY_ID})
+
+
+def auth_stats():
+    return {
+        "mode": AUTH_MODE,
+        "token_cache": TOKEN_CACHE.stats(),
+        "signing_keys": SIGNING_KEYS.stats() if SIGNING_KEYS is not None else None,
+    }
 
 
 def firebase_required(f):
@@ -14,9 +265,8 @@ def firebase_required(f):
 
         token = auth_header.replace("Bearer ", "")
 
-        try:
-            user_info = firebase_auth.verify_id_token(token)
-        except Exception:
+        user_info = verify_token(token)
+        if user_info is None:
             return jsonify({"error": "Invalid token"}), 401
 
         g.user = user_info
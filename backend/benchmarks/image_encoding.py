@@ -0,0 +1,61 @@
+import argparse
+import glob
+import os
+import time
+from PIL import Image
+from services.image_encoding import (
+    EFFORTS, OUTPUT_FORMATS, avif_supported, encode_outputs, encoding_tag, resolve_encoding)
+from services.image_workers import ImageWorkerPool
+
+# Run from the backend folder: python -m benchmarks.image_encoding --quality 95
+# Encodes every sample image in wrong_uploads/ with each format and effort and
+# reports the mean encode time and output size per setting.
+
+
+def load_images(pattern):
+    images = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            images.append((os.path.basename(path), Image.open(path).convert("RGB")))
+        except OSError:
+            continue
+    if not images:
+        raise SystemExit(f"No images found for {pattern}")
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Output encoding time and size per format and effort.")
+    parser.add_argument("--input", default=os.path.join("wrong_uploads", "*"))
+    parser.add_argument("--formats", default=",".join(OUTPUT_FORMATS))
+    parser.add_argument("--quality", type=int, default=95)
+    parser.add_argument("--max-dimension", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_images(args.input)
+    pool = ImageWorkerPool(0)
+    total_pixels = sum(image.width * image.height for _, image in images)
+    print(f"{len(images)} images, {total_pixels / 1e6:.1f} MP in total")
+    print(f"{'setting':<28} {'ms/image':>9} {'KB/image':>9}")
+
+    for format in args.formats.split(","):
+        if format == "avif" and not avif_supported():
+            print(f"{'avif':<28} skipped (no AVIF support in this Pillow)")
+            continue
+        for effort in EFFORTS:
+            encoding = resolve_encoding(format, effort, args.quality, args.max_dimension)
+            timings = []
+            sizes = []
+            for _, image in images:
+                for _ in range(args.repeats):
+                    start = time.perf_counter()
+                    output, = encode_outputs([image], encoding, pool)
+                    timings.append(time.perf_counter() - start)
+                sizes.append(output.getbuffer().nbytes)
+            print(f"{encoding_tag(encoding):<28} {sum(timings) / len(timings) * 1000:>9.1f} "
+                  f"{sum(sizes) / len(sizes) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
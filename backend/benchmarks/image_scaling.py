@@ -0,0 +1,73 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import services.ocr  # noqa: F401  builds the EasyOCR reader before workers fork
+from services.image_workers import ImageWorkerPool
+
+# Run from the backend folder: python -m benchmarks.image_scaling --workers 0,1,2,4,8,16,32
+# Runs the CPU-bound image stages (OCR, blur of the text boxes, encoding of both
+# outputs) for a batch of images and reports throughput per worker count.
+# 0 is the in-process baseline with a single caller thread.
+
+SAVE_KWARGS = {"format": "WebP", "quality": 95, "method": 6}
+
+
+def load_images(pattern):
+    images = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            images.append(Image.open(path).convert("RGB"))
+        except OSError:
+            continue
+    if not images:
+        raise SystemExit(f"No images found for {pattern}")
+    return images
+
+
+def process(pool, image):
+    image = image.copy()
+    ocr_result = pool.ocr(image)
+    boxes = [box for _, box in ocr_result.regions()]
+    blurred = pool.blur(image, boxes)
+    white = Image.new("RGB", image.size, "white")
+    return pool.encode([blurred, white], SAVE_KWARGS)
+
+
+def run(workers, images, count):
+    pool = ImageWorkerPool(workers)
+    pool.warm_up()
+    process(pool, images[0])  # warm-up
+
+    callers = max(1, workers)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as callers_pool:
+        list(callers_pool.map(lambda i: process(pool, images[i % len(images)]), range(count)))
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image pipeline throughput per worker process count.")
+    parser.add_argument("--workers", default="0,1,2,4,8", help="comma separated worker counts")
+    parser.add_argument("--images", type=int, default=32, help="images processed per worker count")
+    parser.add_argument("--input", default=os.path.join("wrong_uploads", "*"))
+    args = parser.parse_args()
+
+    images = load_images(args.input)
+    print(f"{len(images)} input images, {args.images} pipelines per run, {os.cpu_count()} cpus")
+    print(f"{'workers':>8} {'seconds':>9} {'images/s':>9} {'speedup':>8}")
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        elapsed = run(workers, images, args.images)
+        throughput = args.images / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>8} {elapsed:>9.2f} {throughput:>9.2f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Run from the backend folder: python -m benchmarks.llm_throughput --requests 200 --latency 0.5
+# Starts a local server that mimics the OpenAI responses and Anthropic messages
+# endpoints with a fixed latency, then drives translations through the provider layer.
+# With --check-breaker the stub answers with errors instead and the run checks
+# that 4xx replies leave the circuit breaker closed while 5xx replies open it.
+
+
+def make_handler(latency, status=200):
+    # A list so check_breaker can switch the status of a running server.
+    server_status = [status]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        statuses = server_status
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, payload, code=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._reply({"object": "list", "data": [], "has_more": False})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            status = self.statuses[0]
+            if status != 200:
+                self._reply({"type": "error", "error": {
+                    "type": "invalid_request_error" if status < 500 else "api_error",
+                    "message": f"stub error {status}"}}, status)
+            elif self.path.endswith("/responses"):
+                self._reply({
+                    "id": "resp_stub", "object": "response", "created_at": 0, "model": "gpt-4o",
+                    "status": "completed", "output": [{
+                        "type": "message", "id": "msg_stub", "status": "completed", "role": "assistant",
+                        "content": [{"type": "output_text", "text": "translated", "annotations": []}],
+                    }],
+                })
+            else:
+                self._reply({
+                    "id": "msg_stub", "type": "message", "role": "assistant",
+                    "model": "claude-3-7-sonnet-20250219", "stop_reason": "end_turn", "stop_sequence": None,
+                    "content": [{"type": "text", "text": "translated"}],
+                    "usage": {"input_tokens": 1, "output_tokens": 1},
+                })
+
+    return StubHandler
+
+
+def check_breaker(translate, provider, handler):
+    health = provider.health
+    attempts = health.failure_threshold + 2
+    for status, expected in ((400, "closed"), (500, "open")):
+        handler.statuses[0] = status
+        health.record_success()
+        for _ in range(attempts):
+            try:
+                translate("Rečenica.", "hr", "en")
+            except Exception:
+                pass
+        result = "ok" if health.state == expected else "FAILED"
+        print(f"{attempts} x HTTP {status}: breaker {health.state}, expected {expected} ... {result}")
+        if health.state != expected:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM provider throughput against a local stub server.")
+    parser.add_argument("--provider", default="openai", choices=["openai", "anthropic"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=64, help="concurrent Flask-like caller threads")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub response latency in seconds")
+    parser.add_argument("--check-breaker", action="store_true",
+                        help="check that only 5xx stub errors open the circuit breaker")
+    args = parser.parse_args()
+
+    handler = make_handler(0.0 if args.check_breaker else args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+    os.environ.setdefault("LLM_RATE_PER_SEC", "100000")
+    os.environ.setdefault("LLM_RATE_BURST", "100000")
+    if args.check_breaker:
+        os.environ.setdefault("LLM_MAX_RETRIES", "0")
+
+    if args.provider == "openai":
+        from services.openai_llm import openai_translation as translate, openai_provider as provider
+    else:
+        from services.anthropic_llm import anthropic_translation as translate, anthropic_provider as provider
+
+    if args.check_breaker:
+        passed = check_breaker(translate, provider, handler)
+        server.shutdown()
+        raise SystemExit(0 if passed else 1)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(lambda i: translate(f"Rečenica broj {i}.", "hr", "en"), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.provider}: {args.requests} translations in {elapsed:.2f}s "
+          f"({args.requests / elapsed:.1f}/s, stub latency {args.latency}s, "
+          f"max concurrency {provider.max_concurrency})")
+    print(provider.stats())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import difflib
+import gc
+import os
+import time
+import torch
+from models.models_registry import PRECISION_MODES, SUPPORTED_MODELS, load_model_entry
+from services.tokenization import LANGUAGE_MAP
+
+# Run from the backend folder: python -m benchmarks.precision --model facebook/m2m100_1.2B
+
+SENTENCES = [
+    "Dobro jutro, kako ste danas?",
+    "Restoran je otvoren od ponedjeljka do subote.",
+    "Molim vas, donesite mi čašu vode i račun.",
+    "Vlak za Split polazi u devet sati i petnaest minuta.",
+    "Cijena ne uključuje porez na dodanu vrijednost.",
+    "Sastojci: brašno, šećer, jaja, mlijeko i maslac.",
+    "Zabranjeno pušenje u cijeloj zgradi.",
+    "Moja sestra voli svirati klavir poslijepodne.",
+]
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def translate(entry, model_name, texts, src_lang, tgt_lang):
+    tokenizer = entry["tokenizer"]
+    if model_name == "facebook/mbart-large-50-many-to-many-mmt":
+        tokenizer.src_lang = LANGUAGE_MAP[src_lang]
+        tgt_lang_id = tokenizer.lang_code_to_id[LANGUAGE_MAP[tgt_lang]]
+    else:
+        tokenizer.src_lang = src_lang
+        tgt_lang_id = tokenizer.get_lang_id(tgt_lang)
+
+    inputs = tokenizer(texts, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        generated_tokens = entry["model"].generate(
+            **inputs, forced_bos_token_id=tgt_lang_id)
+    return [tokenizer.decode(t, skip_special_tokens=True) for t in generated_tokens]
+
+
+def run_mode(model_name, precision, src_lang, tgt_lang, repeats):
+    rss_before = rss_mb()
+    load_start = time.perf_counter()
+    if precision == "onnx":
+        entry = load_model_entry(model_name, backend="onnx")
+    else:
+        entry = load_model_entry(model_name, precision)
+    load_seconds = time.perf_counter() - load_start
+    rss_after = rss_mb()
+
+    translate(entry, model_name, SENTENCES[:1], src_lang, tgt_lang)  # warm-up
+
+    timings = []
+    outputs = []
+    for _ in range(repeats):
+        outputs = []
+        for sentence in SENTENCES:
+            start = time.perf_counter()
+            outputs.extend(translate(entry, model_name, [sentence], src_lang, tgt_lang))
+            timings.append(time.perf_counter() - start)
+
+    result = {
+        "precision": "onnx" if entry["backend"] == "onnx" else entry["precision"],
+        "load_seconds": load_seconds,
+        "ms_per_sentence": 1000 * sum(timings) / len(timings),
+        "weights_mb": entry["memory_bytes"] / (1024 * 1024),
+        "rss_growth_mb": rss_after - rss_before,
+        "outputs": outputs,
+    }
+    del entry
+    gc.collect()
+    return result
+
+
+def similarity(reference, candidate):
+    return difflib.SequenceMatcher(None, reference, candidate).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare latency, memory and output drift of precision modes.")
+    parser.add_argument("--model", default="facebook/m2m100_1.2B", choices=SUPPORTED_MODELS)
+    parser.add_argument("--modes", default=",".join(PRECISION_MODES),
+                        help="comma separated precisions; add 'onnx' to include the ONNX Runtime backend")
+    parser.add_argument("--src", default="hr")
+    parser.add_argument("--tgt", default="en")
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    # fp32 goes first so it is the quality reference for the other modes.
+    modes = ["fp32"] + [m for m in args.modes.split(",") if m and m != "fp32"]
+    results = [run_mode(args.model, mode, args.src, args.tgt, args.repeats) for mode in modes]
+    reference = results[0]["outputs"]
+
+    print(f"\n{args.model} {args.src}->{args.tgt}, {len(SENTENCES)} sentences x {args.repeats}\n")
+    print(f"{'mode':<6} {'load s':>7} {'ms/sent':>9} {'speedup':>8} {'weights MB':>11} {'RSS +MB':>9} {'similarity':>11}")
+    for result in results:
+        speedup = results[0]["ms_per_sentence"] / result["ms_per_sentence"]
+        score = sum(similarity(r, c) for r, c in zip(reference, result["outputs"])) / len(reference)
+        print(f"{result['precision']:<6} {result['load_seconds']:>7.1f} {result['ms_per_sentence']:>9.1f} {speedup:>7.2f}x "
+              f"{result['weights_mb']:>11.1f} {result['rss_growth_mb']:>9.1f} {score:>11.3f}")
+
+    for result in results[1:]:
+        for sentence, ref, out in zip(SENTENCES, reference, result["outputs"]):
+            if ref != out:
+                print(f"\n[{result['precision']}] {sentence}\n  fp32: {ref}\n  {result['precision']}: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Local speech recognition models (faster-whisper, CTranslate2 on CPU).
+SUPPORTED_ASR_MODELS = ["tiny", "base", "small", "medium", "large-v3"]
+
+ASR_WHISPER_MODEL = os.getenv("ASR_WHISPER_MODEL", "small")
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")
+# Segments recognized at once. The whisper model gets one CTranslate2 worker
+# per parallel segment, each with an equal share of the cores by default.
+ASR_PARALLEL = int(os.getenv("ASR_PARALLEL", "4"))
+ASR_CPU_THREADS = int(os.getenv(
+    "ASR_CPU_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, ASR_PARALLEL)))))
+PRELOAD_ASR_MODELS = [name.strip() for name in os.getenv(
+    "PRELOAD_ASR_MODELS", "").split(",") if name.strip()]
+
+
+def _whisper_model_class():
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError:
+        raise ValueError(
+            "The whisper speech recognition engine requires faster-whisper to be installed.")
+    return WhisperModel
+
+
+def is_supported_asr(model_name):
+    return model_name in SUPPORTED_ASR_MODELS
+
+
+def load_asr_model(model_name):
+    WhisperModel = _whisper_model_class()
+    logger.info(
+        f"Loading speech recognition model: whisper {model_name} ({ASR_COMPUTE_TYPE}, "
+        f"{ASR_PARALLEL} workers x {ASR_CPU_THREADS} threads)\n")
+    return WhisperModel(
+        model_name, device="cpu", compute_type=ASR_COMPUTE_TYPE,
+        cpu_threads=ASR_CPU_THREADS, num_workers=ASR_PARALLEL)
+
+
+class AsrModelRegistry:
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in SUPPORTED_ASR_MODELS}
+        self.loads = 0
+
+    def get(self, model_name):
+        if not is_supported_asr(model_name):
+            raise ValueError(f"Unsupported speech recognition model: {model_name}")
+
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is not None:
+                return model
+
+        # Only one thread loads a given model; the others wait for it.
+        with self._load_locks[model_name]:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is not None:
+                    return model
+
+            model = load_asr_model(model_name)
+            with self._lock:
+                self._models[model_name] = model
+                self.loads += 1
+            return model
+
+    def stats(self):
+        with self._lock:
+            return {"resident": sorted(self._models), "loads": self.loads}
+
+
+ASR_MODEL_REGISTRY = AsrModelRegistry()
+
+
+def load_asr_models(model_names=None):
+    for model_name in model_names if model_names is not None else PRELOAD_ASR_MODELS:
+        if not is_supported_asr(model_name):
+            logger.warning(f"Skipping unsupported speech recognition model: {model_name}")
+            continue
+        ASR_MODEL_REGISTRY.get(model_name)
+    return ASR_MODEL_REGISTRY
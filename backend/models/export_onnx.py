@@ -0,0 +1,10 @@
+import sys
+import logging
+from models.models_registry import SUPPORTED_MODELS, export_onnx_model
+
+# Build step: python -m models.export_onnx [model_name ...]
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for model_name in sys.argv[1:] or SUPPORTED_MODELS:
+        print(export_onnx_model(model_name))
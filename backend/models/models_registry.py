@@ -1,3 +1,8 @@
+import os
+import gc
+import threading
+from collections import OrderedDict
+import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 import logging
 
@@ -9,23 +14,233 @@ def get_tokenizer(model_name):
     return _tokenizer
 
 
-def get_model(model_name):
+def get_model(model_name, precision="fp32"):
     _model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-    return _model
+    _model.eval()
+    return apply_precision(_model, precision)
 
 
-MODEL_REGISTRY = {}
+MODELS_DIR = os.path.dirname(__file__)
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(MODELS_DIR, "onnx"))
+
+BACKENDS = ["torch", "onnx"]
+
+
+def onnx_model_dir(model_name):
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+
+
+def _ort_model_class():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ValueError(
+            "The onnx backend requires optimum[onnxruntime] to be installed.")
+    return ORTModelForSeq2SeqLM
+
+
+def export_onnx_model(model_name):
+    ORTModelForSeq2SeqLM = _ort_model_class()
+    output_dir = onnx_model_dir(model_name)
+    logger.info(f"Exporting {model_name} to ONNX: {output_dir}")
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+    model.save_pretrained(output_dir)
+    get_tokenizer(model_name).save_pretrained(output_dir)
+    return output_dir
+
+
+def get_onnx_model(model_name):
+    ORTModelForSeq2SeqLM = _ort_model_class()
+    model_dir = onnx_model_dir(model_name)
+    if not os.path.isdir(model_dir):
+        logger.warning(
+            f"No exported ONNX graph for {model_name}, exporting now. "
+            "Run `python -m models.export_onnx` at build time to avoid this.")
+        export_onnx_model(model_name)
+    return ORTModelForSeq2SeqLM.from_pretrained(
+        model_dir, provider="CPUExecutionProvider")
+
+
+def onnx_model_bytes(model_name):
+    total = 0
+    for root, _, files in os.walk(onnx_model_dir(model_name)):
+        for fname in files:
+            if fname.endswith((".onnx", ".onnx_data")):
+                total += os.path.getsize(os.path.join(root, fname))
+    return total
+
 
 SUPPORTED_MODELS = [
     "facebook/mbart-large-50-many-to-many-mmt",
     "facebook/m2m100_1.2B",
 ]
 
-def load_models():
-    for model_name in SUPPORTED_MODELS:
-        logger.info(f"Loading model: {model_name}\n")
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        MODEL_REGISTRY[model_name] = {"tokenizer": tokenizer, "model": model}
-    logger.info("All models loaded successfully.")
+MAX_RESIDENT_MODELS = int(os.getenv("MAX_RESIDENT_MODELS", "2"))
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+PRELOAD_MODELS = [name.strip() for name in os.getenv(
+    "PRELOAD_MODELS", "").split(",") if name.strip()]
+
+PRECISION_MODES = ["fp32", "int8", "bf16"]
+
+
+def parse_model_precisions(value):
+    precisions = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        model_name, precision = item.split("=", 1)
+        precision = precision.strip().lower()
+        if precision not in PRECISION_MODES:
+            raise ValueError(f"Unknown precision {precision} for {model_name}")
+        precisions[model_name.strip()] = precision
+    return precisions
+
+
+# e.g. MODEL_PRECISION="facebook/m2m100_1.2B=int8,facebook/mbart-large-50-many-to-many-mmt=bf16"
+MODEL_PRECISION = parse_model_precisions(os.getenv("MODEL_PRECISION", ""))
+
+
+def bf16_supported():
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def apply_precision(model, precision):
+    if precision == "int8":
+        return torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8)
+    if precision == "bf16" and bf16_supported():
+        return model.to(torch.bfloat16)
+    return model
+
+
+def is_supported(model_name):
+    return model_name in SUPPORTED_MODELS
+
+
+def model_memory_bytes(model):
+    params = sum(p.numel() * p.element_size() for p in model.parameters())
+    buffers = sum(b.numel() * b.element_size() for b in model.buffers())
+    # Dynamic quantization moves Linear weights and biases into packed params,
+    # which parameters() and buffers() do not list.
+    packed = 0
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._weight_bias()
+            packed += weight.numel() * weight.element_size()
+            if bias is not None:
+                packed += bias.numel() * bias.element_size()
+    return params + buffers + packed
+
+
+def load_model_entry(model_name, precision="fp32", backend="torch"):
+    if backend == "onnx":
+        logger.info(f"Loading model: {model_name} (onnx)\n")
+        return {
+            "tokenizer": get_tokenizer(model_name),
+            "model": get_onnx_model(model_name),
+            "backend": backend,
+            "precision": "fp32",
+            "memory_bytes": onnx_model_bytes(model_name),
+        }
+
+    if precision == "bf16" and not bf16_supported():
+        logger.warning("CPU has no native bf16 support, keeping fp32 weights")
+        precision = "fp32"
+
+    logger.info(f"Loading model: {model_name} ({precision})\n")
+    tokenizer = get_tokenizer(model_name)
+    model = get_model(model_name, precision)
+    return {
+        "tokenizer": tokenizer,
+        "model": model,
+        "backend": backend,
+        "precision": precision,
+        "memory_bytes": model_memory_bytes(model),
+    }
+
+
+class ModelRegistry:
+    def __init__(self, max_resident=MAX_RESIDENT_MODELS, memory_budget_mb=MODEL_MEMORY_BUDGET_MB):
+        self.max_resident = max(1, max_resident)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {
+            (name, backend): threading.Lock() for name in SUPPORTED_MODELS for backend in BACKENDS}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, model_name, default=None, backend="torch"):
+        if not is_supported(model_name) or backend not in BACKENDS:
+            return default
+
+        key = (model_name, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        # Only one thread loads a given model; the others wait for it.
+        with self._load_locks[key]:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry
+
+            entry = load_model_entry(
+                model_name, MODEL_PRECISION.get(model_name, "fp32"), backend)
+
+            with self._lock:
+                self._entries[key] = entry
+                self.loads += 1
+                self._evict()
+            return entry
+
+    def _resident_bytes(self):
+        return sum(entry["memory_bytes"] for entry in self._entries.values())
+
+    def _evict(self):
+        evicted = False
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_resident
+                or (self.memory_budget and self._resident_bytes() > self.memory_budget)):
+            (model_name, backend), _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            evicted = True
+            logger.info(f"Evicted model: {model_name} ({backend})")
+        if evicted:
+            gc.collect()
+
+    def resident_models(self):
+        with self._lock:
+            return [f"{name}:{backend}" for name, backend in self._entries.keys()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident": {
+                    f"{name}:{backend}": entry["precision"]
+                    for (name, backend), entry in self._entries.items()},
+                "resident_mb": round(self._resident_bytes() / (1024 * 1024), 1),
+                "max_resident": self.max_resident,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
+def load_models(model_names=None):
+    for model_name in model_names if model_names is not None else PRELOAD_MODELS:
+        if not is_supported(model_name):
+            logger.warning(f"Skipping unsupported preload model: {model_name}")
+            continue
+        MODEL_REGISTRY.get(model_name)
+    logger.info(f"Preloaded models: {MODEL_REGISTRY.resident_models()}")
     return MODEL_REGISTRY
@@ -1,7 +1,10 @@
-from typing import List
-from anthropic import Anthropic, APIError, AuthenticationError, RateLimitError, APIConnectionError
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, APIError, AuthenticationError, RateLimitError, APIConnectionError
 import os
+import httpx
 from dotenv import load_dotenv
+from services.llm_health import CircuitBreaker
+from services.llm_provider import LLMProvider, run_sync, iterate_sync
+from services.llm_lines import LINES_FORMAT_INSTRUCTIONS, translate_lines_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,80 +13,100 @@ load_dotenv()
 
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
+def classify_anthropic_error(e):
+    if isinstance(e, AuthenticationError):
+        return 'authentication_error'
+    if isinstance(e, RateLimitError):
+        return 'rate_limit_error'
+    if isinstance(e, APIConnectionError):
+        return 'connection_error'
+    return 'api_error'
+
+
 def check_anthropic_available():
     try:
         client.models.list()
         return {'available': True}
-
-    except AuthenticationError as e:
-        return {'available': False, 'error': {'code': 'authentication_error', 'message': str(e)}}
-    except RateLimitError as e:
-        return {'available': False, 'error': {'code': 'rate_limit_error', 'message': str(e)}}
-    except APIConnectionError as e:
-        return {'available': False, 'error': {'code': 'connection_error', 'message': str(e)}}
     except APIError as e:
-        return {'available': False, 'error': {'code': 'api_error', 'message': str(e)}}
-    
+        return {'available': False, 'error': {'code': classify_anthropic_error(e), 'message': str(e)}}
+
+
+anthropic_health = CircuitBreaker("anthropic", check_anthropic_available)
+
+
+def anthropic_error(message):
+    # anthropic's APIError also expects the failed request, which we do not have here.
+    return APIError(message, request=None, body=None)
+
+
+def build_anthropic_prompt(text, src_lang, tgt_lang):
+    return f"""You are a professional translation assistant. You will get three variables: source language (e.g. 'en'), target (e.g. 'de') and text. Translate the following text from {src_lang} to {tgt_lang}: {text}. Preserve all formatting, punctuation, markdown, and special tokens. Output only the translated text (no quotes). If src_lang == tgt_lang, return text unchanged. Do not add any extra text—output or anything only the translated content. ONLY translation. If received text ({text}) is not in source language ({src_lang}) DO NOT TRANSLATE and write that original text ({text})."""
+
+
+def make_async_anthropic_client(max_connections):
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_connections)
+    return AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0,
+                          http_client=DefaultAsyncHttpxClient(limits=limits))
+
+
+anthropic_provider = LLMProvider(
+    "anthropic", make_async_anthropic_client, classify_anthropic_error, anthropic_error, anthropic_health)
+
+
+async def anthropic_translation_async(text, src_lang, tgt_lang):
+    prompt = build_anthropic_prompt(text, src_lang, tgt_lang)
+    response = await anthropic_provider.call(lambda async_client: async_client.messages.create(
+        model="claude-3-7-sonnet-20250219",
+        max_tokens=1024,
+        temperature=0.2,
+        messages=[
+            {"role": "user", "content": f"{prompt}"}
+        ]
+    ))
+
+    logger.info(f"Translation: {response.content[0].text}\n")
+    return response.content[0].text
+
 
 def anthropic_translation(text, src_lang, tgt_lang):
-    health = check_anthropic_available()
-    if not health['available']:
-        err = health['error']
-        raise APIError(f"{err['code']}: {err['message']}")
-    
-    prompt = f"""You are a professional translation assistant. You will get three variables: source language (e.g. 'en'), target (e.g. 'de') and text, which may be either a Python-style list of strings or a single string. Translate the following text from {src_lang} to {tgt_lang}: {text}. Preserve all formatting, punctuation, markdown, and special tokens. If text is a list (i.e. it begins with '[' and ends with ']'), output a Python list literal of translated strings in the same order and format and for the text from lists add a new line character ('\\n') at the end of every list element. If text is a single string, output only the translated string (no quotes, no list syntax). If src_lang == tgt_lang, return text unchanged. Do not add any extra text—output or anything only the translated content. ONLY translation. If received text ({text}) is not in source language ({src_lang}) DO NOT TRANSLATE and write that original text ({text})."""
+    return run_sync(anthropic_translation_async(text, src_lang, tgt_lang))
 
-    try:
-        response = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
-            max_tokens=1024,
-            temperature=0.2,
-            messages=[
-                {"role": "user", "content": f"{prompt}"}
-            ]
-        )
-    except APIError as e:
-        raise APIError(f"api_error: {str(e)}")
-
-    if isinstance(text, str):
-        logger.info(f"Translation: {response.content[0].text}\n")
-        return response.content[0].text
-    cleaned_text = clean_translated_lines(response.content[0].text)
-    logger.info(f"Translation CT: {cleaned_text}\n")
-    return cleaned_text
-
-
-def clean_translated_lines(raw_response: str) -> List[str]:
-    lines = raw_response.replace("\\n", "\n").splitlines()
-
-    cleaned: List[str] = []
-    for line in lines:
-        stripped = line.strip("[]'\", \t\r\n")
-        if stripped:
-            cleaned.append(stripped)
-    return cleaned
-
-
-def clean_translated_lines2(raw_response):
-    translated_lines = raw_response.split("\\n")
-    cleaned_lines = []
-    for line in translated_lines:
-
-        if line.startswith("['"):
-            line = line.removeprefix("['")
-        if line.startswith('["'):
-            line = line.removeprefix('["')
-        if line.startswith(", '"):
-            line = line.removeprefix(", '")
-        if line.startswith(', "'):
-            line = line.removeprefix(', "')
-        if line.startswith("', '"):
-            line = line.removeprefix("', '")
-        if line.startswith('", "'):
-            line = line.removeprefix('", "')
-        if line.endswith("']"):
-            line = line.removesuffix("']")
-        if line.endswith('"]'):
-            line = line.removesuffix('"]')
-        cleaned_lines.append(line)
-    return cleaned_lines
+
+async def anthropic_stream_deltas(async_client, text, src_lang, tgt_lang):
+    prompt = build_anthropic_prompt(text, src_lang, tgt_lang)
+    async with async_client.messages.stream(
+        model="claude-3-7-sonnet-20250219",
+        max_tokens=1024,
+        temperature=0.2,
+        messages=[
+            {"role": "user", "content": f"{prompt}"}
+        ]
+    ) as stream:
+        async for delta in stream.text_stream:
+            yield delta
+
+
+def anthropic_translation_stream(text, src_lang, tgt_lang):
+    return iterate_sync(anthropic_provider.stream(
+        lambda async_client: anthropic_stream_deltas(async_client, text, src_lang, tgt_lang)))
+
+
+async def anthropic_lines_request(payload, src_lang, tgt_lang):
+    response = await anthropic_provider.call(lambda async_client: async_client.messages.create(
+        model="claude-3-7-sonnet-20250219",
+        max_tokens=1024,
+        temperature=0.2,
+        system=f"You are a professional translation assistant. Translate from {src_lang} to {tgt_lang}, literally and without omission, preserving punctuation and special tokens. {LINES_FORMAT_INSTRUCTIONS}",
+        messages=[
+            {"role": "user", "content": payload}
+        ]
+    ))
+    return response.content[0].text
+
+
+def anthropic_translate_lines(lines, src_lang, tgt_lang):
+    translated = run_sync(translate_lines_async(
+        lines, lambda payload: anthropic_lines_request(payload, src_lang, tgt_lang)))
+    logger.info(f"Translation lines: {translated}\n")
+    return translated
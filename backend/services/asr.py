@@ -0,0 +1,132 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import speech_recognition as sr
+from models.asr_registry import ASR_MODEL_REGISTRY, ASR_WHISPER_MODEL, ASR_PARALLEL
+from services.audio_decode import SAMPLE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+ASR_ENGINE = os.getenv("ASR_ENGINE", "google")
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))
+
+# Voice activity segmentation: cut at pauses of ASR_MIN_SILENCE_MS or more,
+# keeping each segment at most ASR_MAX_SEGMENT_S long. A frame is silent below
+# ASR_SILENCE_DB, or below the recording's noise floor plus ASR_SILENCE_MARGIN_DB
+# when that is lower, so quiet recordings still have speech in them.
+ASR_MAX_SEGMENT_S = float(os.getenv("ASR_MAX_SEGMENT_S", "30"))
+ASR_MIN_SILENCE_MS = int(os.getenv("ASR_MIN_SILENCE_MS", "500"))
+ASR_SILENCE_DB = float(os.getenv("ASR_SILENCE_DB", "-40"))
+ASR_SILENCE_MARGIN_DB = float(os.getenv("ASR_SILENCE_MARGIN_DB", "15"))
+NOISE_FLOOR_PERCENTILE = 10
+FRAME_MS = 30
+
+_asr_pool = ThreadPoolExecutor(max_workers=ASR_PARALLEL, thread_name_prefix="asr")
+
+
+class SpeechRecognitionError(Exception):
+    pass
+
+
+class GoogleAsrEngine:
+    name = "google"
+
+    def transcribe(self, pcm, sample_rate, language):
+        audio_data = sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+        try:
+            return sr.Recognizer().recognize_google(audio_data, language=language)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            logger.info(f"[ERROR] Google API request failed: {e}")
+            raise SpeechRecognitionError("Speech recognition service failed.")
+
+
+class WhisperAsrEngine:
+    def __init__(self, model_name=ASR_WHISPER_MODEL):
+        self.model_name = model_name
+        self.name = f"whisper_:_{model_name}"
+
+    def transcribe(self, pcm, sample_rate, language):
+        model = ASR_MODEL_REGISTRY.get(self.model_name)
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = model.transcribe(
+            audio, language=language, beam_size=ASR_BEAM_SIZE, vad_filter=False)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+def get_asr_engine(name=None):
+    # "google", "whisper" or "whisper_:_<size>", like the translation composites.
+    name = name or ASR_ENGINE
+    engine, _, model_name = name.partition("_:_")
+    if engine == "google":
+        return GoogleAsrEngine()
+    if engine == "whisper":
+        return WhisperAsrEngine(model_name or ASR_WHISPER_MODEL)
+    raise ValueError(f"Unknown speech recognition engine {name}")
+
+
+def split_on_silence(pcm, sample_rate):
+    # Returns (start, end) sample ranges of the speech segments.
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10
+    levels = 20 * np.log10(rms)
+    noise_floor = np.percentile(levels, NOISE_FLOOR_PERCENTILE)
+    silent = levels < min(ASR_SILENCE_DB, noise_floor + ASR_SILENCE_MARGIN_DB)
+
+    max_frames = max(1, int(ASR_MAX_SEGMENT_S * 1000 / FRAME_MS))
+    min_silence = max(1, ASR_MIN_SILENCE_MS // FRAME_MS)
+
+    segments = []
+    start = None
+    silence_run = 0
+    for index in range(count):
+        if start is None:
+            if not silent[index]:
+                start = index
+            continue
+        silence_run = silence_run + 1 if silent[index] else 0
+        if silence_run >= min_silence:
+            segments.append((start, index - silence_run + 1))
+            start = None
+            silence_run = 0
+        elif index - start + 1 >= max_frames:
+            segments.append((start, index + 1))
+            start = None
+            silence_run = 0
+    if start is not None:
+        segments.append((start, count))
+    if not segments:
+        # Nothing stood out from the noise; let the recognizer decide instead
+        # of reporting the recording as not understood without trying.
+        segments = [(begin, min(begin + max_frames, count)) for begin in range(0, count, max_frames)]
+
+    last = len(samples)
+    return [(begin * frame, last if end == count else end * frame) for begin, end in segments]
+
+
+def iter_segment_transcripts(engine, pcm, sample_rate, language):
+    # Recognizes all segments in parallel and yields (start_s, end_s, text)
+    # in recording order as soon as each one and those before it are done.
+    ranges = split_on_silence(pcm, sample_rate)
+    futures = [
+        _asr_pool.submit(
+            engine.transcribe, pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH], sample_rate, language)
+        for start, end in ranges]
+    for (start, end), future in zip(ranges, futures):
+        yield start / sample_rate, end / sample_rate, future.result().strip()
+
+
+def transcribe(engine, pcm, sample_rate, language):
+    texts = [text for _, _, text in iter_segment_transcripts(engine, pcm, sample_rate, language) if text]
+    if not texts:
+        logger.info("[ERROR] Could not understand the audio")
+        raise SpeechRecognitionError("Could not understand the audio.")
+    return " ".join(texts)
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import logging
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def _ffmpeg_command(source, sample_rate):
+    return [
+        FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+
+
+def _run_ffmpeg(source, sample_rate, **kwargs):
+    try:
+        return subprocess.run(_ffmpeg_command(source, sample_rate), capture_output=True, **kwargs)
+    except OSError as e:
+        # Usually a missing or non-executable FFMPEG_BINARY, not a bad upload.
+        logger.error(f"[ERROR] Could not run {FFMPEG_BINARY}: {e}")
+        raise AudioDecodeError(f"Could not run {FFMPEG_BINARY} to decode the audio.")
+
+
+def decode_audio(audio_bytes, sample_rate=AUDIO_SAMPLE_RATE):
+    # Returns mono 16-bit little-endian PCM at sample_rate. ffmpeg detects the
+    # container from the bytes, so any format it knows works.
+    if hasattr(os, "memfd_create"):
+        # MP4/M4A files often keep their index at the end, which ffmpeg cannot
+        # reach through a pipe; an in-memory file is seekable and never hits disk.
+        fd = os.memfd_create("upload")
+        try:
+            os.write(fd, audio_bytes)
+            os.lseek(fd, 0, os.SEEK_SET)
+            result = _run_ffmpeg(f"/dev/fd/{fd}", sample_rate, pass_fds=(fd,))
+        finally:
+            os.close(fd)
+    else:
+        result = _run_ffmpeg("pipe:0", sample_rate, input=audio_bytes)
+
+    if result.returncode != 0 or not result.stdout:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        logger.info(f"[ERROR] ffmpeg could not decode the audio: {message}")
+        raise AudioDecodeError("Could not decode the audio file.")
+    return result.stdout
@@ -1,5 +1,5 @@
-import speech_recognition as sr
-from pydub import AudioSegment
+from services.audio_decode import AudioDecodeError, decode_audio, AUDIO_SAMPLE_RATE
+from services.asr import SpeechRecognitionError, get_asr_engine, iter_segment_transcripts, transcribe
 from services.text_translate import translate_input_text
 import logging
 
@@ -7,45 +7,44 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class SpeechRecognitionError(Exception):
-    pass
-
-
-r = sr.Recognizer()
-
+def load_pcm(audio_bytes):
+    logger.info(f"\nRecieved audio file: {len(audio_bytes)} bytes\n")
+    try:
+        return decode_audio(audio_bytes, AUDIO_SAMPLE_RATE)
+    except AudioDecodeError as e:
+        raise SpeechRecognitionError(str(e))
 
-def m4a_to_wav(audio_file):
-    logger.info(f"\nRecieved audio file: {audio_file}\n")
-    wav_audio_dir = "./uploads/audio/WAV/"
-    path, file = audio_file.split('\\')
-    sound = AudioSegment.from_file(audio_file, format="m4a")
-    base, ext = file.split('.')
-    wav_file_name = f"{base}.wav"
-    wav_audio = sound.export(wav_audio_dir+wav_file_name, format="wav")
-    return wav_audio
 
+def extract_text_from_audio(audio_bytes, src_lang, asr_engine=None):
+    engine = get_asr_engine(asr_engine)
+    pcm = load_pcm(audio_bytes)
+    speech_to_text = transcribe(engine, pcm, AUDIO_SAMPLE_RATE, src_lang)
+    speech_to_text = speech_to_text.lower()
+    logger.info(f"Audio extraction text ({engine.name}): {speech_to_text}\n")
+    return speech_to_text
 
-def extract_text_from_audio(audio_file, src_lang):
-    r = sr.Recognizer()
-    wav = m4a_to_wav(audio_file)
-    with sr.AudioFile(wav) as source:
-        audio_data = r.record(source)
 
-    try:
-        speech_to_text = r.recognize_google(audio_data, language=src_lang)
-        speech_to_text = speech_to_text.lower()
-        logger.info(f"Audio extraction text: {speech_to_text}\n")
-        return speech_to_text
-    except sr.UnknownValueError:
-        logger.info("[ERROR] Could not understand the audio")
-        raise SpeechRecognitionError("Could not understand the audio.")
-    except sr.RequestError as e:
-        logger.info(f"[ERROR] Google API request failed: {e}")
-        raise SpeechRecognitionError("Speech recognition service failed.")
-
-
-def translate_audio_file(audio_text, src_lang, tgt_lang, composite):
+def translate_audio_file(audio_text, src_lang, tgt_lang, composite, profile=None):
     translated_speech = translate_input_text(
-        audio_text, src_lang, tgt_lang, composite)
+        audio_text, src_lang, tgt_lang, composite, profile)
     logger.info(translated_speech)
     return translated_speech
+
+
+def stream_audio_transcripts(audio_bytes, src_lang, asr_engine=None):
+    # Yields one dict per recognized segment, in recording order, while later
+    # segments are still being recognized in parallel. Translation is left to
+    # the caller, so it can check the language first.
+    engine = get_asr_engine(asr_engine)
+    pcm = load_pcm(audio_bytes)
+    index = 0
+    for start, end, text in iter_segment_transcripts(engine, pcm, AUDIO_SAMPLE_RATE, src_lang):
+        if not text:
+            continue
+        yield {
+            "index": index,
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "text": text.lower(),
+        }
+        index += 1
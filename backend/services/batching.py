@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_WAIT_MS = float(os.getenv("BATCH_WAIT_MS", "10"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+# A batcher with no requests for this many seconds stops its thread.
+BATCH_IDLE_S = float(os.getenv("BATCH_IDLE_S", "300"))
+
+
+class _BatcherClosed(Exception):
+    pass
+
+
+class _PendingRequest:
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    def __init__(self, name, run_batch, max_wait_ms=BATCH_WAIT_MS, max_batch_size=BATCH_MAX_SIZE,
+                 idle_timeout=BATCH_IDLE_S, on_close=None):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.idle_timeout = idle_timeout
+        self.on_close = on_close
+        self.closed = False
+
+        self._pending = deque()
+        self._queued = 0
+        self._cond = threading.Condition()
+
+        self.batches = 0
+        self.sentences = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+
+        self._thread = threading.Thread(
+            target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+
+        request = _PendingRequest(texts)
+        with self._cond:
+            if self.closed:
+                raise _BatcherClosed(self.name)
+            self._pending.append(request)
+            self._queued += len(texts)
+            self.max_queue_depth = max(self.max_queue_depth, self._queued)
+            self._cond.notify()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                if not self._cond.wait(self.idle_timeout) and not self._pending:
+                    self.closed = True
+                    return None
+
+            # Give concurrent callers a short window to join this batch.
+            deadline = time.monotonic() + self.max_wait
+            while self._queued < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            size = 0
+            while self._pending:
+                next_size = len(self._pending[0].texts)
+                if batch and size + next_size > self.max_batch_size:
+                    break
+                batch.append(self._pending.popleft())
+                size += next_size
+            self._queued -= size
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                logger.info(f"Stopping idle batcher: {self.name}")
+                if self.on_close is not None:
+                    self.on_close(self)
+                return
+            texts = [text for request in batch for text in request.texts]
+
+            try:
+                outputs = self.run_batch(texts)
+            except Exception as e:
+                logger.warning(f"Batch {self.name} failed: {e}")
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+
+            offset = 0
+            for request in batch:
+                request.result = outputs[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                request.done.set()
+
+            with self._cond:
+                self.batches += 1
+                self.sentences += len(texts)
+                self.batch_sizes[len(texts)] += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": self._queued,
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "sentences": self.sentences,
+                "batch_size_histogram": {
+                    str(size): count for size, count in sorted(self.batch_sizes.items())},
+            }
+
+
+_BATCHERS = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def _retire(key, batcher):
+    with _BATCHERS_LOCK:
+        if _BATCHERS.get(key) is batcher:
+            del _BATCHERS[key]
+
+
+def get_batcher(key, run_batch):
+    with _BATCHERS_LOCK:
+        batcher = _BATCHERS.get(key)
+        if batcher is None:
+            name = "|".join(key)
+            logger.info(f"Starting batcher: {name}")
+            batcher = MicroBatcher(
+                name, run_batch, idle_timeout=BATCH_IDLE_S, on_close=lambda closed: _retire(key, closed))
+            _BATCHERS[key] = batcher
+        return batcher
+
+
+def submit_batched(key, run_batch, texts):
+    # Retries on a fresh batcher if the one found has just stopped for idleness.
+    while True:
+        try:
+            return get_batcher(key, run_batch).submit(texts)
+        except _BatcherClosed:
+            time.sleep(0.001)
+
+
+def get_batching_stats():
+    with _BATCHERS_LOCK:
+        batchers = list(_BATCHERS.values())
+    return {batcher.name: batcher.stats() for batcher in batchers}
@@ -0,0 +1,113 @@
+import os
+import logging
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp")
+IMAGE_EFFORT = os.getenv("IMAGE_EFFORT", "balanced")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "95"))
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "0"))
+
+EFFORTS = ["fast", "balanced", "max"]
+
+# Pillow save arguments per format and effort. WebP method 6 (the old
+# default) is "max"; "balanced" is method 4, usually several times faster.
+OUTPUT_FORMATS = {
+    "webp": {
+        "format": "WebP",
+        "ext": "webp",
+        "mimetype": "image/webp",
+        "efforts": {"fast": {"method": 2}, "balanced": {"method": 4}, "max": {"method": 6}},
+    },
+    "jpeg": {
+        "format": "JPEG",
+        "ext": "jpg",
+        "mimetype": "image/jpeg",
+        "efforts": {"fast": {}, "balanced": {"optimize": True},
+                    "max": {"optimize": True, "progressive": True}},
+    },
+    "png": {
+        "format": "PNG",
+        "ext": "png",
+        "mimetype": "image/png",
+        "lossless": True,
+        "efforts": {"fast": {"compress_level": 1}, "balanced": {"compress_level": 6},
+                    "max": {"compress_level": 9, "optimize": True}},
+    },
+    "avif": {
+        "format": "AVIF",
+        "ext": "avif",
+        "mimetype": "image/avif",
+        "efforts": {"fast": {"speed": 8}, "balanced": {"speed": 6}, "max": {"speed": 4}},
+    },
+}
+
+
+def avif_supported():
+    # Pillow 11.2+ ships AVIF; older versions need the pillow-avif-plugin package.
+    try:
+        if features.check("avif"):
+            return True
+    except ValueError:
+        pass
+    try:
+        import pillow_avif  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_encoding(format=None, effort=None, quality=None, max_dimension=None):
+    format = (format or IMAGE_FORMAT).lower()
+    format = "jpeg" if format == "jpg" else format
+    effort = effort or IMAGE_EFFORT
+    quality = IMAGE_QUALITY if quality in (None, "") else int(quality)
+    max_dimension = IMAGE_MAX_DIMENSION if max_dimension in (None, "") else int(max_dimension)
+
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format {format}")
+    if format == "avif" and not avif_supported():
+        raise ValueError("AVIF output is not available on this server.")
+    if effort not in EFFORTS:
+        raise ValueError(f"Unknown encoding effort {effort}")
+    if not 1 <= quality <= 100:
+        raise ValueError("Quality must be between 1 and 100.")
+    if max_dimension < 0:
+        raise ValueError("Max dimension must not be negative.")
+
+    return {"format": format, "effort": effort, "quality": quality, "max_dimension": max_dimension}
+
+
+def encoding_tag(encoding):
+    # Part of the output file name and cache key, so settings never share results.
+    spec = OUTPUT_FORMATS[encoding["format"]]
+    quality = "" if spec.get("lossless") else f"-q{encoding['quality']}"
+    size = f"-{encoding['max_dimension']}px" if encoding["max_dimension"] else ""
+    return f"{encoding['format']}-{encoding['effort']}{quality}{size}"
+
+
+def output_extension(encoding):
+    return OUTPUT_FORMATS[encoding["format"]]["ext"]
+
+
+def save_kwargs(encoding):
+    spec = OUTPUT_FORMATS[encoding["format"]]
+    kwargs = {"format": spec["format"], **spec["efforts"][encoding["effort"]]}
+    if not spec.get("lossless"):
+        kwargs["quality"] = encoding["quality"]
+    return kwargs
+
+
+def fit_to_max_dimension(image, max_dimension):
+    if not max_dimension or max(image.size) <= max_dimension:
+        return image
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return image
+
+
+def encode_outputs(images, encoding, pool):
+    # pool is an ImageWorkerPool; all images are encoded in parallel.
+    images = [fit_to_max_dimension(image, encoding["max_dimension"]) for image in images]
+    return pool.encode(images, save_kwargs(encoding))
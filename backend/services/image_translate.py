@@ -1,61 +1,36 @@
 import os
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ExifTags
-import torch
+from PIL import Image, ImageDraw, ImageFont, ExifTags
 import pytesseract
-from services.openai_llm import openai_translation
-from services.anthropic_llm import anthropic_translation
-from services.ocr import extract_word_boxes_easy_ocr, extract_word_boxes_pytesseract, merge_line_boxes, group_boxes_to_lines
-from models.models_registry import MODEL_REGISTRY
+from services.openai_llm import openai_translate_lines
+from services.anthropic_llm import anthropic_translate_lines
+from services.ocr import extract_word_boxes_pytesseract, merge_line_boxes, group_boxes_to_lines
+from services.text_translate import ml_translate, parse_composite, resolve_profile, is_partial
+from services.line_cache import translate_lines_cached
+from services.image_workers import IMAGE_POOL
+from services.image_encoding import encode_outputs, resolve_encoding
 from utils.lang_detector import get_lang
 import logging
 
 logger = logging.getLogger(__name__)
 
-LANGUAGE_MAP = {
-    "hr": "hr_HR",
-    "en": "en_XX",
-    "es": "es_XX",
-    "de": "de_DE",
-    "fr": "fr_XX",
-    "nl": "nl_XX",
-    "it": "it_IT",
-}
 
+def translate_image_texts(texts, src_lang, tgt_lang, model_name, backend="torch", profile=None):
+    translated = ml_translate(texts, src_lang, tgt_lang, model_name, backend, profile)
+    logger.info(f"\nTokenizer:\n{translated}\n")
+    return translated
 
-def translate_image_texts(texts, src_lang, tgt_lang, model_name):
-    entry = MODEL_REGISTRY.get(model_name)
-    if not entry:
-        raise ValueError(f"Unsupported model: {model_name}")
 
-    tokenizer = entry["tokenizer"]
-    model = entry["model"]
-
-    logger.info(f"Using model: {model.config.name_or_path}")
-
-    if model_name == "facebook/mbart-large-50-many-to-many-mmt":
-        mapped_src_lang = LANGUAGE_MAP.get(src_lang)
-        mapped_tgt_lang = LANGUAGE_MAP.get(tgt_lang)
-
-        tokenizer.src_lang = mapped_src_lang
-        tgt_lang_id = tokenizer.lang_code_to_id[mapped_tgt_lang]
-
-    elif model_name == "facebook/m2m100_1.2B":
-        tokenizer.src_lang = src_lang
-        tgt_lang_id = tokenizer.get_lang_id(tgt_lang)
-
-    else:
-        raise ValueError(f"Unsupported model: {model_name}")
-
-    inputs = tokenizer(texts, return_tensors="pt",
-                       padding=True, truncation=False)
-
-    with torch.no_grad():
-        generated_tokens = model.generate(
-            **inputs, forced_bos_token_id=tgt_lang_id)
-    logger.info(
-        f"\nTokenizer:\n{[tokenizer.decode(t, skip_special_tokens=True) for t in generated_tokens]}\n")
-    return [tokenizer.decode(t, skip_special_tokens=True) for t in generated_tokens]
+def translate_lines(texts, src_lang, tgt_lang, engine, model_name, backend, profile=None):
+    if engine == "ml":
+        return translate_image_texts(
+            texts, src_lang, tgt_lang, model_name, backend, profile)
+    elif engine == "llm" and model_name == "chatgpt":
+        logger.info("Using OpenAI\n")
+        return openai_translate_lines(texts, src_lang, tgt_lang)
+    elif engine == "llm" and model_name == "claude":
+        logger.info("\nUsing Anthropic\n")
+        return anthropic_translate_lines(texts, src_lang, tgt_lang)
+    raise ValueError(f"Unknown model {engine}_:_{model_name}")
 
 
 def get_font_size(translated_lines, merged_boxes):
@@ -71,9 +46,13 @@ def get_font_size(translated_lines, merged_boxes):
     return font_size
 
 
-def erase_and_replace_text(image, src_lang, tgt_lang, composite):
-    engine, model_name = composite.split('_:_')
-    word_regions = extract_word_boxes_easy_ocr(image)
+def erase_and_replace_text(image, src_lang, tgt_lang, composite, ocr_result=None, profile=None, with_white=True):
+    engine, model_name, backend = parse_composite(composite)
+    if engine == "ml":
+        profile = resolve_profile(profile)
+    if ocr_result is None:
+        ocr_result = IMAGE_POOL.ocr(image)
+    word_regions = ocr_result.regions()
     # word_regions = extract_word_boxes_pytesseract(image)
 
     lines = group_boxes_to_lines(word_regions, y_threshold=30)
@@ -88,31 +67,23 @@ def erase_and_replace_text(image, src_lang, tgt_lang, composite):
     if not line_texts:
         raise ValueError("No text detected in image to translate.")
 
-    translated_lines = []
-    if engine == "ml":
-        translated_lines = translate_image_texts(
-            line_texts, src_lang, tgt_lang, model_name)
-    elif engine == "llm" and model_name == "chatgpt":
-        logger.info("Using OpenAI\n")
-        translated_lines = openai_translation(line_texts, src_lang, tgt_lang)
-    elif engine == "llm" and model_name == "claude":
-        logger.info("\nUsing Anthropic\n")
-        translated_lines = anthropic_translation(
-            line_texts, src_lang, tgt_lang)
+    translated_lines = translate_lines_cached(
+        line_texts, src_lang, tgt_lang, f"{engine}:{model_name}:{backend}:{profile}",
+        lambda texts: translate_lines(texts, src_lang, tgt_lang, engine, model_name, backend, profile))
 
     font_size = get_font_size(translated_lines, merged_boxes)
 
-    white_image = image.copy()
-    draw_white = ImageDraw.Draw(white_image)
-    draw_white.rectangle([(0, 0), white_image.size], fill="white")
+    white_image = None
+    if with_white:
+        white_image = image.copy()
+        draw_white = ImageDraw.Draw(white_image)
+        draw_white.rectangle([(0, 0), white_image.size], fill="white")
+
+    image = IMAGE_POOL.blur(image, merged_boxes, radius=30)  # 30
 
     draw = ImageDraw.Draw(image)
     for (translated_text, box) in zip(translated_lines, merged_boxes):
         x, y, w, h = map(int, box)
-        region = image.crop((x, y, x + w, y + h))
-        blurred_region = region.filter(
-            ImageFilter.GaussianBlur(radius=30))  # 30
-        image.paste(blurred_region, (x, y))
 
         font = ImageFont.truetype("arial.ttf", font_size)
         bbox_text = font.getbbox(translated_text)
@@ -123,9 +94,10 @@ def erase_and_replace_text(image, src_lang, tgt_lang, composite):
         text_y = y + (h - text_height) / 2
 
         draw.text((text_x, text_y), translated_text, fill="black", font=font)
-        draw_white.text((text_x, text_y), translated_text,
-                        fill="black", font=font)
-    return image, white_image
+        if with_white:
+            draw_white.text((text_x, text_y), translated_text,
+                            fill="black", font=font)
+    return image, white_image, any(map(is_partial, translated_lines))
 
 
 def correct_image_orientation(image):
@@ -151,19 +123,20 @@ def correct_image_orientation(image):
     return image
 
 
-def translate_image_file(file, src_lang, tgt_lang, composite):
+def translate_image_file(file, src_lang, tgt_lang, composite, ocr_result=None, profile=None,
+                         encoding=None, with_white=True):
 
     image = file.convert("RGB")
+    encoding = encoding or resolve_encoding()
+
+    # partial is True when a line hit the decoding time budget; such results are not cached.
+    translated_image_original, translated_image_white, partial = erase_and_replace_text(
+        image, src_lang, tgt_lang, composite, ocr_result, profile, with_white)
+
+    if not with_white:
+        img_io_original, = encode_outputs([translated_image_original], encoding, IMAGE_POOL)
+        return img_io_original, None, partial
 
-    translated_image_original, translated_image_white = erase_and_replace_text(
-        image, src_lang, tgt_lang, composite)
-
-    img_io_original = BytesIO()
-    img_io_white = BytesIO()
-    # translated_image_original.save(img_io_original, format="PNG")
-    # translated_image_white.save(img_io_white, format="PNG")
-    translated_image_original.save(img_io_original, format="WebP", quality=95, method=6)
-    translated_image_white.save(img_io_white, format="WebP", quality=95, method=6)
-    img_io_original.seek(0)
-    img_io_white.seek(0)
-    return img_io_original, img_io_white
+    img_io_original, img_io_white = encode_outputs(
+        [translated_image_original, translated_image_white], encoding, IMAGE_POOL)
+    return img_io_original, img_io_white, partial
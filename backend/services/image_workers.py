@@ -0,0 +1,222 @@
+import os
+import threading
+import logging
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from PIL import Image, ImageFilter
+
+logger = logging.getLogger(__name__)
+
+# 0 keeps OCR, blur and encoding on the calling thread.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "0"))
+IMAGE_WORKER_THREADS = int(os.getenv("IMAGE_WORKER_THREADS", "1"))
+BLUR_RADIUS = 30
+
+# Pillow releases the GIL while encoding, so in-process encodes still overlap.
+_encode_threads = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-encode")
+
+
+class SharedImage:
+    # Copies an RGB image into shared memory once; workers map the same pages
+    # instead of unpickling a copy of the pixels.
+    def __init__(self, image):
+        pixels = np.asarray(image.convert("RGB"))
+        self.shm = shared_memory.SharedMemory(create=True, size=pixels.nbytes)
+        self.shape = pixels.shape
+        np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)[:] = pixels
+
+    @property
+    def ref(self):
+        return self.shm.name, self.shape
+
+    def to_image(self):
+        return Image.fromarray(np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf).copy())
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(ref):
+    # Workers share the parent's resource tracker (started before the fork),
+    # so attaching does not make a worker unlink the segment when it exits.
+    name, shape = ref
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+    # Workers are forked after services.ocr built the EasyOCR reader, so each
+    # one starts with the model already loaded (shared copy-on-write).
+    import services.ocr  # noqa: F401
+
+
+def _ocr_task(ref):
+    from services.ocr import run_ocr_array
+    shm, pixels = _attach(ref)
+    try:
+        return run_ocr_array(pixels).words
+    finally:
+        del pixels
+        shm.close()
+
+
+def blur_boxes(image, boxes, radius=BLUR_RADIUS):
+    for box in boxes:
+        x, y, w, h = map(int, box)
+        region = image.crop((x, y, x + w, y + h))
+        image.paste(region.filter(ImageFilter.GaussianBlur(radius=radius)), (x, y))
+    return image
+
+
+def _blur_task(ref, boxes, radius):
+    # Blurs in place, so the parent reads the result straight from shared memory.
+    shm, pixels = _attach(ref)
+    try:
+        image = blur_boxes(Image.fromarray(pixels), boxes, radius)
+        pixels[:] = np.asarray(image)
+    finally:
+        del pixels
+        shm.close()
+
+
+def encode_image(image, save_kwargs):
+    output = BytesIO()
+    image.save(output, **save_kwargs)
+    output.seek(0)
+    return output
+
+
+def _encode_task(ref, save_kwargs):
+    shm, pixels = _attach(ref)
+    try:
+        return encode_image(Image.fromarray(pixels), save_kwargs).getvalue()
+    finally:
+        del pixels
+        shm.close()
+
+
+class ImageWorkerPool:
+    def __init__(self, workers=IMAGE_WORKERS, threads=IMAGE_WORKER_THREADS):
+        if workers and "fork" not in multiprocessing.get_all_start_methods():
+            logger.warning("Image worker processes need fork, running image stages in-process")
+            workers = 0
+        self.workers = workers
+        self.threads = threads
+        self._executor = None
+        self._lock = threading.Lock()
+        self.tasks = {"ocr": 0, "blur": 0, "encode": 0}
+        self.broken = False
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting {self.workers} image worker processes")
+                resource_tracker.ensure_running()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("fork"),
+                    initializer=_init_worker, initargs=(self.threads,))
+            return self._executor
+
+    def _count(self, task):
+        with self._lock:
+            self.tasks[task] += 1
+
+    def _disable(self, error):
+        # A worker died (e.g. killed for memory) and the executor is unusable.
+        # Forking new workers now would copy loaded models and running threads,
+        # so the remaining work stays in-process.
+        with self._lock:
+            executor, self._executor = self._executor, None
+            if self.workers:
+                logger.error(f"Image worker pool is broken ({error}), running image stages in-process")
+            self.workers = 0
+            self.broken = True
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self, inline, remote):
+        if self.workers:
+            try:
+                return remote(self._pool())
+            except BrokenProcessPool as e:
+                self._disable(e)
+        return inline()
+
+    def warm_up(self):
+        # Call before models are loaded and threads are started: a fork pool
+        # launches all workers on first use, and they inherit the process as is.
+        if self.workers:
+            try:
+                list(self._pool().map(int, range(self.workers)))
+            except BrokenProcessPool as e:
+                self._disable(e)
+
+    def ocr(self, image):
+        from services.ocr import OcrResult, run_ocr
+        self._count("ocr")
+
+        def remote(pool):
+            with SharedImage(image) as shared:
+                return OcrResult(pool.submit(_ocr_task, shared.ref).result())
+        return self._dispatch(lambda: run_ocr(image), remote)
+
+    def blur(self, image, boxes, radius=BLUR_RADIUS):
+        self._count("blur")
+
+        def remote(pool):
+            with SharedImage(image) as shared:
+                pool.submit(_blur_task, shared.ref, list(boxes), radius).result()
+                return shared.to_image()
+        return self._dispatch(lambda: blur_boxes(image, boxes, radius), remote)
+
+    def encode(self, images, save_kwargs):
+        # Encodes several images at once, one worker each.
+        self._count("encode")
+
+        def inline():
+            if len(images) == 1:
+                return [encode_image(images[0], save_kwargs)]
+            return list(_encode_threads.map(lambda image: encode_image(image, save_kwargs), images))
+
+        def remote(pool):
+            shared = [SharedImage(image) for image in images]
+            try:
+                futures = [pool.submit(_encode_task, item.ref, save_kwargs) for item in shared]
+                return [BytesIO(future.result()) for future in futures]
+            finally:
+                for item in shared:
+                    item.close()
+        return self._dispatch(inline, remote)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads,
+                "started": self._executor is not None,
+                "broken": self.broken,
+                "tasks": dict(self.tasks),
+            }
+
+
+IMAGE_POOL = ImageWorkerPool()
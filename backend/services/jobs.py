@@ -0,0 +1,205 @@
+import os
+import json
+import threading
+import time
+import uuid
+import socket
+import logging
+import ipaddress
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+# Queued jobs hold their uploads in memory; beyond this many, submit refuses.
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+JOB_CALLBACK_ATTEMPTS = int(os.getenv("JOB_CALLBACK_ATTEMPTS", "3"))
+# Comma-separated host names callbacks may go to; empty allows any public host.
+JOB_CALLBACK_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv(
+    "JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()}
+
+
+def validate_callback_url(url):
+    # The server POSTs to this URL, so it must not reach internal services:
+    # only http(s), only allowed hosts, and no private or loopback addresses.
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL.")
+    host = parsed.hostname.lower()
+    if JOB_CALLBACK_ALLOWED_HOSTS and host not in JOB_CALLBACK_ALLOWED_HOSTS:
+        raise ValueError(f"callback_url host {host} is not allowed.")
+
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError):
+        raise ValueError(f"callback_url host {host} could not be resolved.")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback_url host {host} is not a public address.")
+    return url
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the callback at an internal address after validation.
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL, max_queued=JOB_MAX_QUEUED):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.max_queued = max_queued
+        # Maps a pipeline exception to (http_status, message); set by the app.
+        self.describe_error = lambda e: (500, str(e))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, kind, fn, owner=None, callback_url=None):
+        # fn() runs the whole pipeline on a worker thread and returns the
+        # response dict the synchronous route would have returned.
+        if callback_url:
+            validate_callback_url(callback_url)
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "owner": owner,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "callback_url": callback_url,
+        }
+        with self._lock:
+            if self.max_queued and self.submitted - self.started >= self.max_queued:
+                self.rejected += 1
+                raise JobQueueFull("Too many queued jobs, try again later.")
+            self._purge(job["submitted_at"])
+            self._jobs[job["id"]] = job
+            self.submitted += 1
+        self._pool.submit(self._run, job, fn)
+        return job["id"]
+
+    def _run(self, job, fn):
+        started = time.time()
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = started
+            self.started += 1
+            wait = started - job["submitted_at"]
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        try:
+            result, error = fn(), None
+        except Exception as e:
+            logger.exception(f"{job['kind']} job {job['id']} failed")
+            status, message = self.describe_error(e)
+            result, error = None, {"message": message, "status": status}
+
+        with self._lock:
+            job["result"] = result
+            job["error"] = error
+            job["status"] = "failed" if error else "done"
+            job["finished_at"] = time.time()
+            if error:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+        if job["callback_url"]:
+            self._send_callback(job)
+
+    def _send_callback(self, job):
+        body = json.dumps(self.public_view(job)).encode("utf-8")
+        for attempt in range(1, JOB_CALLBACK_ATTEMPTS + 1):
+            req = urllib.request.Request(
+                job["callback_url"], data=body, method="POST",
+                headers={"Content-Type": "application/json"})
+            try:
+                # Resolve again: the host's DNS may have changed since submit.
+                validate_callback_url(job["callback_url"])
+                with _callback_opener.open(req, timeout=JOB_CALLBACK_TIMEOUT):
+                    return
+            except Exception as e:
+                logger.warning(
+                    f"Callback for job {job['id']} failed (attempt {attempt}): {e}")
+                if attempt < JOB_CALLBACK_ATTEMPTS:
+                    time.sleep(attempt)
+
+    def _purge(self, now):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] and now - job["finished_at"] > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id, owner=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["owner"] != owner:
+                return None
+            return self.public_view(job)
+
+    def public_view(self, job):
+        view = {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "submitted_at": job["submitted_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+        if job["status"] == "queued":
+            view["queue_position"] = sum(
+                1 for other in self._jobs.values()
+                if other["status"] == "queued" and other["submitted_at"] <= job["submitted_at"])
+        if job["result"] is not None:
+            view["result"] = job["result"]
+        if job["error"] is not None:
+            view["error"] = job["error"]
+        return view
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            queued = [job for job in self._jobs.values() if job["status"] == "queued"]
+            return {
+                "workers": self.workers,
+                "queued": len(queued),
+                "running": sum(1 for job in self._jobs.values() if job["status"] == "running"),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_queued": self.max_queued,
+                "oldest_queued_wait_s": max((now - job["submitted_at"] for job in queued), default=0.0),
+                "avg_wait_s": self.total_wait / self.started if self.started else 0.0,
+                "max_wait_s": self.max_wait,
+            }
+
+
+JOB_QUEUE = JobQueue()
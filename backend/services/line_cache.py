@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+from services.text_translate import is_partial
+import logging
+
+logger = logging.getLogger(__name__)
+
+LINE_CACHE_SIZE = int(os.getenv("LINE_CACHE_SIZE", "20000"))
+
+
+def normalize_line(text):
+    return " ".join(text.split())
+
+
+class LineCache:
+    def __init__(self, max_entries=LINE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+LINE_CACHE = LineCache()
+
+
+def translate_lines_cached(lines, src_lang, tgt_lang, model_id, translate_fn):
+    normalized = [normalize_line(line) for line in lines]
+    results = [None] * len(lines)
+
+    # Repeated lines within one image are translated once as well.
+    missing = OrderedDict()
+    for i, text in enumerate(normalized):
+        cached = LINE_CACHE.get((model_id, src_lang, tgt_lang, text))
+        if cached is not None:
+            results[i] = cached
+        else:
+            missing.setdefault(text, []).append(i)
+
+    logger.info(
+        f"Line cache: {len(lines) - sum(map(len, missing.values()))} cached, {len(missing)} to translate\n")
+    if not missing:
+        return results
+
+    texts = list(missing.keys())
+    translated = translate_fn(texts)
+    if len(translated) != len(texts):
+        logger.warning(
+            f"Expected {len(texts)} translated lines, got {len(translated)}; not caching them")
+
+    for text, translation in zip(texts, translated):
+        # None means the line could not be translated; show the source line without caching it.
+        # A partial translation is shown as is but not cached either.
+        if translation is not None and not is_partial(translation) and len(translated) == len(texts):
+            LINE_CACHE.set((model_id, src_lang, tgt_lang, text), translation)
+        for i in missing[text]:
+            results[i] = translation
+
+    return [result if result is not None else line for result, line in zip(results, lines)]
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+LLM_PROBE_INTERVAL = float(os.getenv("LLM_PROBE_INTERVAL", "30"))
+
+# Errors that say nothing about the provider being down.
+IGNORED_ERROR_CODES = {"rate_limit_error"}
+
+
+class CircuitBreaker:
+    def __init__(self, name, probe, failure_threshold=LLM_FAILURE_THRESHOLD, probe_interval=LLM_PROBE_INTERVAL):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+
+        self.state = "closed"
+        self.failures = 0
+        self.last_error = None
+        self.opened_at = None
+        self.rejected = 0
+
+        self._lock = threading.Lock()
+        self._monitor = None
+
+    def status(self):
+        with self._lock:
+            if self.state == "open":
+                self.rejected += 1
+                return {'available': False, 'error': self.last_error}
+            return {'available': True}
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != "closed":
+                logger.info(f"{self.name} is available again, closing circuit")
+            self.state = "closed"
+            self.opened_at = None
+
+    def record_failure(self, code, message):
+        if code in IGNORED_ERROR_CODES:
+            return
+        with self._lock:
+            self.failures += 1
+            self.last_error = {'code': code, 'message': message}
+            if self.state == "open" or self.failures < self.failure_threshold:
+                return
+            logger.warning(
+                f"{self.name} failed {self.failures} times in a row, opening circuit: {message}")
+            self.state = "open"
+            self.opened_at = time.time()
+            self._start_monitor()
+
+    def _start_monitor(self):
+        if self._monitor is None:
+            self._monitor = threading.Thread(
+                target=self._probe_loop, name=f"health-{self.name}", daemon=True)
+            self._monitor.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                if self.state == "closed":
+                    self._monitor = None
+                    return
+
+            health = self.probe()
+            if health['available']:
+                self.record_success()
+                continue
+            with self._lock:
+                self.last_error = health['error']
+            logger.info(f"{self.name} probe failed: {health['error']['message']}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "opened_at": self.opened_at,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
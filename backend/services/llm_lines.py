@@ -0,0 +1,103 @@
+import os
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keep each request well below the 1024 output token limit of the LLM calls;
+# the JSON wrapper around every line and non-Latin scripts cost extra tokens.
+LLM_LINES_PER_CHUNK = int(os.getenv("LLM_LINES_PER_CHUNK", "40"))
+LLM_CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "800"))
+LLM_LINE_ATTEMPTS = int(os.getenv("LLM_LINE_ATTEMPTS", "3"))
+
+LINES_FORMAT_INSTRUCTIONS = (
+    'The input is a JSON object {"items": [{"i": <int>, "text": <string>}, ...]}. '
+    "Translate every text on its own. "
+    'Reply with ONLY a JSON object {"items": [{"i": <int>, "text": <translation>}, ...]} '
+    "containing exactly one item for every input item, with the same i values. "
+    "Never merge, split, reorder or skip items and do not add any other text."
+)
+
+
+def build_lines_payload(items):
+    return json.dumps({"items": [{"i": i, "text": text} for i, text in items]}, ensure_ascii=False)
+
+
+def parse_lines_response(raw_response, expected_indices):
+    # Tolerate code fences or chatter around the JSON object.
+    text = raw_response.strip()
+    start = min([pos for pos in (text.find("{"), text.find("[")) if pos != -1], default=-1)
+    if start == -1:
+        return {}
+
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text[start:])
+    except json.JSONDecodeError:
+        return {}
+
+    items = data.get("items", []) if isinstance(data, dict) else data
+    translated = {}
+    if not isinstance(items, list):
+        return translated
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("i")
+        value = item.get("text")
+        if isinstance(index, int) and index in expected_indices and isinstance(value, str):
+            translated[index] = value.strip()
+    return translated
+
+
+def chunk_items(items):
+    chunks = []
+    current = []
+    size = 0
+    for index, text in items:
+        if current and (len(current) >= LLM_LINES_PER_CHUNK or size + len(text) > LLM_CHUNK_CHARS):
+            chunks.append(current)
+            current = []
+            size = 0
+        current.append((index, text))
+        size += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_failed_chunk(chunk, translated):
+    # A reply cut off at the output token limit parses to nothing, so a
+    # resent chunk of the same size would be cut off again; halve it instead.
+    missing = [(i, text) for i, text in chunk if i not in translated]
+    if len(missing) < 2:
+        return [missing] if missing else []
+    middle = len(missing) // 2
+    return [missing[:middle], missing[middle:]]
+
+
+async def translate_lines_async(lines, request_fn):
+    # request_fn(payload) sends one JSON payload to the LLM and returns the raw reply.
+    translated = {}
+    chunks = chunk_items(list(enumerate(lines)))
+    pending = []
+
+    for attempt in range(LLM_LINE_ATTEMPTS):
+        replies = await asyncio.gather(
+            *(request_fn(build_lines_payload(chunk)) for chunk in chunks))
+
+        for chunk, reply in zip(chunks, replies):
+            translated.update(parse_lines_response(reply, {i for i, _ in chunk}))
+
+        chunks = [part for chunk in chunks for part in split_failed_chunk(chunk, translated)]
+        pending = [item for chunk in chunks for item in chunk]
+        if not pending:
+            break
+        logger.info(
+            f"LLM reply missing {len(pending)} of {len(lines)} lines, re-requesting "
+            f"in {len(chunks)} smaller chunks (attempt {attempt + 1})")
+
+    if pending:
+        logger.warning(f"Keeping {len(pending)} lines untranslated after {LLM_LINE_ATTEMPTS} attempts")
+    # None marks a line the LLM never returned, so callers do not mistake it for a translation.
+    return [translated.get(i) for i in range(len(lines))]
@@ -0,0 +1,211 @@
+import os
+import asyncio
+import queue
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERROR_CODES = {"rate_limit_error", "connection_error", "api_error"}
+
+
+def is_retryable(code, error):
+    # api_error also covers 4xx responses such as bad requests; only retry 5xx.
+    if code == "api_error":
+        return getattr(error, "status_code", 500) >= 500
+    return code in RETRYABLE_ERROR_CODES
+
+
+def is_provider_failure(code, error):
+    # A 4xx api_error (bad request, prompt too long, ...) is a problem with the
+    # request, not with the provider, so it must not trip the circuit breaker.
+    if code == "api_error":
+        return getattr(error, "status_code", 500) >= 500
+    return True
+
+
+def provider_setting(provider, key, default):
+    # OPENAI_MAX_CONCURRENCY overrides LLM_MAX_CONCURRENCY, and so on.
+    value = os.getenv(f"{provider.upper()}_{key}", os.getenv(f"LLM_{key}"))
+    return type(default)(value) if value is not None else default
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    # All providers share one event loop thread, so a Flask worker thread only
+    # blocks on its own future while the loop keeps many requests in flight.
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever,
+                             name="llm-event-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+class _StreamError:
+    def __init__(self, error):
+        self.error = error
+
+
+def iterate_sync(async_iterable):
+    # Bridges an async generator running on the provider loop to a plain
+    # generator that a Flask response can consume.
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+        except Exception as e:
+            items.put(_StreamError(e))
+        finally:
+            items.put(done)
+
+    asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    while True:
+        item = items.get()
+        if item is done:
+            return
+        if isinstance(item, _StreamError):
+            raise item.error
+        yield item
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, max_wait):
+        # Runs on the single event loop thread, so no lock is needed.
+        deadline = time.monotonic() + max_wait
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class LLMProvider:
+    def __init__(self, name, client_factory, classify_error, make_error, health):
+        self.name = name
+        self.client_factory = client_factory
+        self.classify_error = classify_error
+        self.make_error = make_error
+        self.health = health
+
+        self.max_concurrency = provider_setting(name, "MAX_CONCURRENCY", 16)
+        self.max_retries = provider_setting(name, "MAX_RETRIES", 3)
+        self.backoff_base = provider_setting(name, "BACKOFF_BASE", 0.5)
+        self.rate_limit_wait = provider_setting(name, "RATE_LIMIT_WAIT", 5.0)
+        self.bucket = TokenBucket(
+            provider_setting(name, "RATE_PER_SEC", 10.0),
+            provider_setting(name, "RATE_BURST", 20))
+
+        self._client = None
+        self._semaphore = None
+        self.in_flight = 0
+        self.completed = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def _ensure_started(self):
+        # Created lazily so they bind to the provider event loop.
+        if self._client is None:
+            self._client = self.client_factory(self.max_concurrency)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _admit(self):
+        health = self.health.status()
+        if not health['available']:
+            error = health['error']
+            raise self.make_error(f"{error['code']}: {error['message']}")
+
+        self._ensure_started()
+        if not await self.bucket.acquire(self.rate_limit_wait):
+            self.throttled += 1
+            raise self.make_error(
+                f"rate_limit_error: Too many {self.name} requests, try again later.")
+
+    async def call(self, request_fn):
+        await self._admit()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await self._call_with_retries(request_fn)
+            finally:
+                self.in_flight -= 1
+
+    async def _call_with_retries(self, request_fn):
+        attempt = 0
+        while True:
+            try:
+                response = await request_fn(self._client)
+            except Exception as e:
+                code = self.classify_error(e)
+                if is_retryable(code, e) and attempt < self.max_retries:
+                    attempt += 1
+                    self.retries += 1
+                    # Full jitter keeps retries from many requests from lining up.
+                    delay = random.uniform(0, self.backoff_base * 2 ** attempt)
+                    logger.info(f"{self.name} {code}, retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                if is_provider_failure(code, e):
+                    self.health.record_failure(code, str(e))
+                raise self.make_error(f"{code}: {str(e)}")
+
+            self.health.record_success()
+            self.completed += 1
+            return response
+
+    async def stream(self, stream_fn):
+        # stream_fn(client) is an async generator of text deltas. Streams are
+        # not retried, since part of the output may already be on its way.
+        await self._admit()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async for delta in stream_fn(self._client):
+                    yield delta
+            except Exception as e:
+                code = self.classify_error(e)
+                if is_provider_failure(code, e):
+                    self.health.record_failure(code, str(e))
+                raise self.make_error(f"{code}: {str(e)}")
+            finally:
+                self.in_flight -= 1
+
+        self.health.record_success()
+        self.completed += 1
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "max_concurrency": self.max_concurrency,
+        }
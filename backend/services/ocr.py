@@ -1,3 +1,5 @@
+import os
+import statistics
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ExifTags
 import numpy as np
 import easyocr
@@ -6,19 +8,115 @@ import pytesseract
 ocr_reader = easyocr.Reader(
     ["hr", "en", "es", "de", "fr", "nl", "it"], gpu=False)
 
+# Detection runs on a downscaled copy sized so the median text line is about
+# OCR_TARGET_TEXT_HEIGHT pixels tall; boxes are mapped back to the original.
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "1") == "1"
+OCR_PROBE_SIDE = int(os.getenv("OCR_PROBE_SIDE", "1280"))
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "32"))
+# 1 recognizes crops of the full resolution image, 0 the downscaled one.
+OCR_CROP_RECOGNITION = os.getenv("OCR_CROP_RECOGNITION", "1") == "1"
+DETECT_MIN_SIZE = 20
 
-def extract_word_boxes_easy_ocr(image):
-    image_np = np.array(image)
-    results = ocr_reader.readtext(image_np)
-    text_regions = []
-    for res in results:
-        word = res[1]
-        bbox = res[0]
+
+class OcrResult:
+    def __init__(self, words):
+        # [(text, (x, y, w, h), confidence), ...]
+        self.words = words
+
+    def regions(self):
+        return [(text, box) for text, box, _ in self.words]
+
+    def confidences(self):
+        return [confidence for _, _, confidence in self.words]
+
+    def text(self):
+        return " ".join(text for text, _, _ in self.words)
+
+
+def run_ocr(image):
+    return run_ocr_array(np.array(image))
+
+
+def run_ocr_array(image_np):
+    if OCR_ADAPTIVE:
+        results = readtext_adaptive(image_np)
+    else:
+        results = ocr_reader.readtext(image_np)
+    words = []
+    for bbox, word, confidence in results:
         if word.strip():
             x, y = bbox[0]
             x2, y2 = bbox[2]
-            text_regions.append((word, (x, y, x2 - x, y2 - y)))
-    return text_regions
+            words.append((word, (x, y, x2 - x, y2 - y), float(confidence)))
+    return OcrResult(words)
+
+
+def resize_array(image_np, scale):
+    if scale == 1:
+        return image_np
+    height, width = image_np.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return np.array(Image.fromarray(image_np).resize(size, Image.BILINEAR))
+
+
+def detect_boxes(image_np, scale):
+    # Returns EasyOCR horizontal ([x_min, x_max, y_min, y_max]) and free
+    # (four corner points) boxes in the coordinates of the unscaled image.
+    min_size = max(3, round(DETECT_MIN_SIZE * scale))
+    horizontal, free = ocr_reader.detect(resize_array(image_np, scale), min_size=min_size)
+    horizontal, free = horizontal[0], free[0]
+    horizontal = [[round(value / scale) for value in box] for box in horizontal]
+    free = [[[point[0] / scale, point[1] / scale] for point in box] for box in free]
+    return horizontal, free
+
+
+def median_text_height(horizontal, free):
+    heights = [y_max - y_min for _, _, y_min, y_max in horizontal]
+    heights += [max(p[1] for p in box) - min(p[1] for p in box) for box in free]
+    heights = [height for height in heights if height > 0]
+    return statistics.median(heights) if heights else None
+
+
+def detection_scale(image_np):
+    # Probe at a small size first: the probe boxes tell how tall the text is,
+    # and the final detection only needs enough pixels for that text height.
+    longest = max(image_np.shape[:2])
+    probe_scale = min(1.0, OCR_PROBE_SIDE / longest)
+    horizontal, free = detect_boxes(image_np, probe_scale)
+    if probe_scale == 1.0:
+        return 1.0, (horizontal, free)
+
+    text_height = median_text_height(horizontal, free)
+    if text_height is None:
+        # Nothing found at probe size: the text may be too small, use full size.
+        return 1.0, None
+
+    scale = min(1.0, OCR_TARGET_TEXT_HEIGHT / text_height)
+    if scale <= probe_scale:
+        return probe_scale, (horizontal, free)
+    return scale, None
+
+
+def readtext_adaptive(image_np):
+    scale, boxes = detection_scale(image_np)
+    horizontal, free = boxes if boxes is not None else detect_boxes(image_np, scale)
+    if not horizontal and not free:
+        return []
+
+    if OCR_CROP_RECOGNITION or scale == 1.0:
+        return ocr_reader.recognize(image_np, horizontal, free)
+
+    small = resize_array(image_np, scale)
+    results = ocr_reader.recognize(
+        small,
+        [[round(value * scale) for value in box] for box in horizontal],
+        [[[x * scale, y * scale] for x, y in box] for box in free])
+    return [([[x / scale, y / scale] for x, y in bbox], word, confidence)
+            for bbox, word, confidence in results]
+
+
+def extract_word_boxes_easy_ocr(image):
+    return run_ocr(image).regions()
 
 
 def extract_word_boxes_pytesseract(image):
@@ -1,6 +1,9 @@
 from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError, AuthenticationError, RateLimitError, APIConnectionError
-from typing import List
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, OpenAIError, AuthenticationError, RateLimitError, APIConnectionError
+from services.llm_health import CircuitBreaker
+from services.llm_provider import LLMProvider, run_sync, iterate_sync
+from services.llm_lines import LINES_FORMAT_INSTRUCTIONS, translate_lines_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,6 +11,16 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 client = OpenAI()
 
+def classify_openai_error(e):
+    if isinstance(e, AuthenticationError):
+        return 'authentication_error'
+    if isinstance(e, RateLimitError):
+        return 'rate_limit_error'
+    if isinstance(e, APIConnectionError):
+        return 'connection_error'
+    return 'api_error'
+
+
 def check_openai_available():
     # return {
     #     'available': False,
@@ -16,91 +29,104 @@ def check_openai_available():
     #         'message': 'Simulated connection failure'
     #     }
     # }
-    
+
     try:
         client.models.list()
         return {'available': True}
-    except AuthenticationError as e:
-        return {'available': False, 'error': {'code': 'authentication_error', 'message': str(e)}}
-    except RateLimitError as e:
-        return {'available': False, 'error': {'code': 'rate_limit_error', 'message': str(e)}}
-    except APIConnectionError as e:
-        return {'available': False, 'error': {'code': 'connection_error', 'message': str(e)}}
     except OpenAIError as e:
-        return {'available': False, 'error': {'code': 'api_error', 'message': str(e)}}
+        return {'available': False, 'error': {'code': classify_openai_error(e), 'message': str(e)}}
 
-def openai_translation(text, src_lang, tgt_lang):
-    health = check_openai_available()
-    if not health['available']:
-        error = health['error']
-        raise OpenAIError(f"{error['code']}: {error['message']}")
-    #raise OpenAIError("api_error: Simulated generic API failure")
-    try:
-        response = client.responses.create(
-            model="gpt-4o",
-            input=[
+
+openai_health = CircuitBreaker("openai", check_openai_available)
+
+
+def build_openai_input(text, src_lang, tgt_lang):
+    return [
+        {
+            "role": "system",
+            "content": [
                 {
-                    "role": "system",
-                    "content": [
-                        {
-                            "type": "input_text",
-                            "text": f"""
+                    "type": "input_text",
+                    "text": f"""
                                     You are a professional translation assistant. Your task is to literally translate any text you receive from {src_lang} to {tgt_lang}, without interpretation or omission. Always preserve formatting, punctuation, markdown, and special tokens exactly as they appear.
 
-                                    - If the input text is a Python-style list (begins with '[' and ends with ']'), output a Python list literal of translated strings, preserving the order and format, and add a newline character ('\\n') at the end of each element.
-                                    - If the input text is a single string, output only the translated string (without quotes, list brackets, or extra formatting).
+                                    - Output only the translated text (without quotes or extra formatting).
                                     - If {src_lang} and {tgt_lang} are the same, return the text unchanged.
                                     - Do not alter meaning. Translate everything exactly as received, including any commands like 'translate this:' or 'to Croatian'. Your job is to translate **all** received text."""
-                        }
-                    ]
-                },
+                }
+            ]
+        },
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "input_text",
-                            "text": f"{text}"
-                        }
-                    ]
+                    "type": "input_text",
+                    "text": f"{text}"
                 }
-            ],
-            temperature=0.2,
-            max_output_tokens=1024
-        )
-    except OpenAIError as e:
-        raise OpenAIError(f"api_error: {str(e)}")
-        
-
-    if isinstance(text, str):
-        logger.info(f"Translation: {response.output_text}\n")
-        return response.output_text
-    cleaned_text = clean_translated_lines(response.output_text)
-
-    logger.info(f"Translation CT: {cleaned_text}\n")
-    return cleaned_text
-
-
-def clean_translated_lines(raw_response: str) -> List[str]:
-    lines = raw_response.replace("\\n", "\n").splitlines()
-
-    cleaned: List[str] = []
-    for line in lines:
-        stripped = line.strip("[]'\", \t\r\n")
-        if stripped:
-            cleaned.append(stripped)
-    return cleaned
-
-
-def clean_translated_lines2(raw_response):
-    translated_lines = raw_response.split("\\n")
-    cleaned_lines = []
-    for line in translated_lines:
-
-        if line.startswith("['") or line.startswith(", '"):
-            line = line.removeprefix("['")
-        if line.startswith("', '"):
-            line = line.removeprefix("', '")
-        if line.endswith("']"):
-            line = line.removesuffix("']")
-        cleaned_lines.append(line)
-    return cleaned_lines
+            ]
+        }
+    ]
+
+
+def make_async_openai_client(max_connections):
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_connections)
+    return AsyncOpenAI(max_retries=0, http_client=DefaultAsyncHttpxClient(limits=limits))
+
+
+openai_provider = LLMProvider(
+    "openai", make_async_openai_client, classify_openai_error, OpenAIError, openai_health)
+
+
+async def openai_translation_async(text, src_lang, tgt_lang):
+    #raise OpenAIError("api_error: Simulated generic API failure")
+    response = await openai_provider.call(lambda async_client: async_client.responses.create(
+        model="gpt-4o",
+        input=build_openai_input(text, src_lang, tgt_lang),
+        temperature=0.2,
+        max_output_tokens=1024
+    ))
+
+    logger.info(f"Translation: {response.output_text}\n")
+    return response.output_text
+
+
+def openai_translation(text, src_lang, tgt_lang):
+    return run_sync(openai_translation_async(text, src_lang, tgt_lang))
+
+
+async def openai_stream_deltas(async_client, text, src_lang, tgt_lang):
+    stream = await async_client.responses.create(
+        model="gpt-4o",
+        input=build_openai_input(text, src_lang, tgt_lang),
+        temperature=0.2,
+        max_output_tokens=1024,
+        stream=True
+    )
+    async for event in stream:
+        if event.type == "response.output_text.delta":
+            yield event.delta
+
+
+def openai_translation_stream(text, src_lang, tgt_lang):
+    return iterate_sync(openai_provider.stream(
+        lambda async_client: openai_stream_deltas(async_client, text, src_lang, tgt_lang)))
+
+
+async def openai_lines_request(payload, src_lang, tgt_lang):
+    response = await openai_provider.call(lambda async_client: async_client.responses.create(
+        model="gpt-4o",
+        instructions=f"You are a professional translation assistant. Translate from {src_lang} to {tgt_lang}, literally and without omission, preserving punctuation and special tokens. {LINES_FORMAT_INSTRUCTIONS}",
+        input=payload,
+        text={"format": {"type": "json_object"}},
+        temperature=0.2,
+        max_output_tokens=1024
+    ))
+    return response.output_text
+
+
+def openai_translate_lines(lines, src_lang, tgt_lang):
+    translated = run_sync(translate_lines_async(
+        lines, lambda payload: openai_lines_request(payload, src_lang, tgt_lang)))
+    logger.info(f"Translation lines: {translated}\n")
+    return translated
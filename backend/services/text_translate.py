@@ -1,62 +1,210 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 import torch
-from services.openai_llm import openai_translation
-from services.anthropic_llm import anthropic_translation
-from models.models_registry import MODEL_REGISTRY
+from services.openai_llm import openai_translation, openai_translation_stream
+from services.anthropic_llm import anthropic_translation, anthropic_translation_stream
+from models.models_registry import MODEL_REGISTRY, BACKENDS, is_supported
+from services.batching import submit_batched, BATCH_MAX_SIZE
+from services.tokenization import encode, decode, target_lang_id, model_lang_code
 import logging
 
 logger = logging.getLogger(__name__)
-LANGUAGE_MAP = {
-    "hr": "hr_HR",
-    "en": "en_XX",
-    "es": "es_XX",
-    "de": "de_DE",
-    "fr": "fr_XX",
-    "nl": "nl_XX",
-    "it": "it_IT",
+
+# Whitespace after sentence punctuation, or any run of whitespace containing a line break.
+SENTENCE_BOUNDARY = re.compile(r"((?<=[.!?…])\s+|\s*\n\s*)")
+ML_MAX_SEGMENT_CHARS = int(os.getenv("ML_MAX_SEGMENT_CHARS", "400"))
+
+# max_new_tokens = input length * length_ratio + length_offset; max_time is the
+# latency budget in seconds after which generate stops and returns what it has.
+DECODING_PROFILES = {
+    "fast": {
+        "num_beams": 1,
+        "length_ratio": 1.5,
+        "length_offset": 10,
+        "max_time": float(os.getenv("DECODING_FAST_BUDGET", "5")),
+    },
+    "quality": {
+        "num_beams": 5,
+        "length_ratio": 2.0,
+        "length_offset": 20,
+        "max_time": float(os.getenv("DECODING_QUALITY_BUDGET", "20")),
+    },
 }
+DEFAULT_DECODING_PROFILE = os.getenv("DEFAULT_DECODING_PROFILE", "quality")
 
 
-def ml_translate(texts, src_lang, tgt_lang, model_name):
-    entry = MODEL_REGISTRY.get(model_name)
-    if not entry:
-        raise ValueError(f"Unsupported model: {model_name}")
+class PartialTranslation(str):
+    # Output of a generate call that ran into the profile's max_time and may be
+    # cut off mid-sentence. It is returned to the user but never cached.
+    pass
 
-    tokenizer = entry["tokenizer"]
-    model = entry["model"]
 
-    logger.info(f"Using model: {model.config.name_or_path}")
+def is_partial(text):
+    return isinstance(text, PartialTranslation)
 
-    if model_name == "facebook/mbart-large-50-many-to-many-mmt":
-        mapped_src_lang = LANGUAGE_MAP.get(src_lang)
-        mapped_tgt_lang = LANGUAGE_MAP.get(tgt_lang)
 
-        tokenizer.src_lang = mapped_src_lang
-        tgt_lang_id = tokenizer.lang_code_to_id[mapped_tgt_lang]
+_ml_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ml-document")
 
-    elif model_name == "facebook/m2m100_1.2B":
-        tokenizer.src_lang = src_lang
-        tgt_lang_id = tokenizer.get_lang_id(tgt_lang)
 
+def parse_composite(composite):
+    # "<engine>_:_<model>[_:_<backend>]", e.g. "ml_:_facebook/m2m100_1.2B_:_onnx"
+    parts = composite.split('_:_')
+    if len(parts) == 2:
+        engine, model_name = parts
+        backend = "torch" if engine == "ml" else None
+    elif len(parts) == 3:
+        engine, model_name, backend = parts
     else:
+        raise ValueError(f"Unknown model {composite}")
+
+    if engine == "ml" and backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend} in {composite}")
+    return engine, model_name, backend
+
+
+def resolve_profile(profile):
+    profile = profile or DEFAULT_DECODING_PROFILE
+    if profile not in DECODING_PROFILES:
+        raise ValueError(f"Unknown decoding profile {profile}")
+    return profile
+
+
+def generation_kwargs(profile, input_length):
+    settings = DECODING_PROFILES[profile]
+    return {
+        "num_beams": settings["num_beams"],
+        "do_sample": False,
+        "max_new_tokens": int(input_length * settings["length_ratio"] + settings["length_offset"]),
+        "max_time": settings["max_time"],
+    }
+
+
+def generate_translations(texts, src_lang, tgt_lang, model_name, backend="torch", profile=DEFAULT_DECODING_PROFILE):
+    entry = MODEL_REGISTRY.get(model_name, backend=backend)
+    if not entry:
         raise ValueError(f"Unsupported model: {model_name}")
 
-    inputs = tokenizer(texts, return_tensors="pt",
-                       padding=True, truncation=False)
+    model = entry["model"]
+
+    logger.info(f"Using model: {model.config.name_or_path} ({backend})")
+
+    tgt_lang_id = target_lang_id(model_name, tgt_lang, backend)
+    inputs = encode(model_name, texts, src_lang, backend)
 
+    kwargs = generation_kwargs(profile, inputs["input_ids"].shape[1])
+    start = time.monotonic()
     with torch.no_grad():
         generated_tokens = model.generate(
-            **inputs, forced_bos_token_id=tgt_lang_id)
+            **inputs, forced_bos_token_id=tgt_lang_id, **kwargs)
+    elapsed = time.monotonic() - start
+
+    translations = decode(model_name, generated_tokens, src_lang, backend)
+    if elapsed >= kwargs["max_time"]:
+        # generate stops the whole batch at max_time, so any of them may be cut off.
+        logger.warning(
+            f"Generation hit the {profile} budget of {kwargs['max_time']}s "
+            f"({elapsed:.1f}s, {len(texts)} texts), not caching the results")
+        return [PartialTranslation(translation) for translation in translations]
+    return translations
+
+
+def ml_translate(texts, src_lang, tgt_lang, model_name, backend="torch", profile=None):
+    if not is_supported(model_name):
+        raise ValueError(f"Unsupported model: {model_name}")
+    profile = resolve_profile(profile)
+    # Checked before a batcher (and its thread) is created for the pair.
+    model_lang_code(model_name, src_lang)
+    model_lang_code(model_name, tgt_lang)
+
+    return submit_batched(
+        (model_name, backend, profile, src_lang, tgt_lang),
+        lambda batch: generate_translations(batch, src_lang, tgt_lang, model_name, backend, profile),
+        texts)
+
+
+def split_sentences(text):
+    # Returns [(sentence, trailing_whitespace), ...] so the caller can rebuild
+    # the original spacing around the translated sentences.
+    parts = SENTENCE_BOUNDARY.split(text)
+    sentences = parts[0::2]
+    separators = parts[1::2] + [""]
+    return [(sentence, sep) for sentence, sep in zip(sentences, separators) if sentence or sep]
+
+
+def split_long_segment(sentence):
+    pieces = []
+    while len(sentence) > ML_MAX_SEGMENT_CHARS:
+        window = sentence[:ML_MAX_SEGMENT_CHARS]
+        cut = max(window.rfind(", "), window.rfind("; "), window.rfind(": ")) + 2
+        if cut < 2:
+            cut = window.rfind(" ") + 1
+        if cut < 1:
+            cut = ML_MAX_SEGMENT_CHARS
+        head = sentence[:cut].rstrip()
+        pieces.append((head, sentence[len(head):cut]))
+        sentence = sentence[cut:]
+    pieces.append((sentence, ""))
+    return pieces
+
+
+def segment_document(text):
+    stripped = text.lstrip()
+    segments = [("", text[:len(text) - len(stripped)])] if stripped != text else []
+    for sentence, separator in split_sentences(stripped):
+        pieces = split_long_segment(sentence)
+        last_text, last_sep = pieces[-1]
+        pieces[-1] = (last_text, last_sep + separator)
+        segments.extend(pieces)
+    return segments
+
+
+def translate_segments(sentences, src_lang, tgt_lang, model_name, backend, profile):
+    # Similar lengths go into the same request so batches carry little padding.
+    unique = sorted(set(sentences), key=len)
+    buckets = [unique[i:i + BATCH_MAX_SIZE] for i in range(0, len(unique), BATCH_MAX_SIZE)]
+    futures = [
+        _ml_pool.submit(ml_translate, bucket, src_lang, tgt_lang, model_name, backend, profile)
+        for bucket in buckets
+    ]
+    translated = {}
+    for bucket, future in zip(buckets, futures):
+        translated.update(zip(bucket, future.result()))
+    return [translated[sentence] for sentence in sentences]
 
-    return [tokenizer.decode(t, skip_special_tokens=True) for t in generated_tokens]
 
+def translate_document(text, src_lang, tgt_lang, model_name, backend="torch", profile=None):
+    segments = segment_document(text)
+    sentences = [segment for segment, _ in segments if segment.strip()]
+    translated = translate_segments(sentences, src_lang, tgt_lang, model_name, backend, profile)
+    translations = iter(translated)
+    document = "".join(
+        (next(translations) if segment.strip() else segment) + separator
+        for segment, separator in segments)
+    return PartialTranslation(document) if any(map(is_partial, translated)) else document
 
-def translate_input_text(text, src_lang, tgt_lang, composite):
-    engine, model_name = composite.split('_:_')
+
+def stream_ml_translation(text, src_lang, tgt_lang, model_name, backend, profile=None):
+    segments = segment_document(text)
+    # Submit every sentence at once so they share batches, then yield in order.
+    futures = [
+        _ml_pool.submit(ml_translate, [segment], src_lang, tgt_lang, model_name, backend, profile)
+        if segment.strip() else None
+        for segment, _ in segments
+    ]
+    for (segment, separator), future in zip(segments, futures):
+        translated = future.result()[0] if future is not None else segment
+        yield PartialTranslation(translated + separator) if is_partial(translated) else translated + separator
+
+
+def translate_input_text(text, src_lang, tgt_lang, composite, profile=None):
+    engine, model_name, backend = parse_composite(composite)
     logger.info(f"Model name: {engine} {model_name}\n")
     if engine == "ml":
         logger.info(
             f"Using machine learnining model:\n{model_name}, {text}, {src_lang}, {tgt_lang}\n")
-        return ml_translate([text], src_lang, tgt_lang, model_name)[0]
+        return translate_document(text, src_lang, tgt_lang, model_name, backend, profile)
     elif engine == "llm" and model_name == "chatgpt":
         logger.info(f"Using OpenAI:\n{text}, {src_lang}, {tgt_lang}\n")
         return openai_translation(text, src_lang, tgt_lang)
@@ -65,3 +213,15 @@ def translate_input_text(text, src_lang, tgt_lang, composite):
         return anthropic_translation(text, src_lang, tgt_lang)
     else:
         raise ValueError(f"Unknown model {composite}")
+
+
+def translate_input_text_stream(text, src_lang, tgt_lang, composite, profile=None):
+    engine, model_name, backend = parse_composite(composite)
+    if engine == "ml":
+        return stream_ml_translation(text, src_lang, tgt_lang, model_name, backend, profile)
+    elif engine == "llm" and model_name == "chatgpt":
+        return openai_translation_stream(text, src_lang, tgt_lang)
+    elif engine == "llm" and model_name == "claude":
+        return anthropic_translation_stream(text, src_lang, tgt_lang)
+    else:
+        raise ValueError(f"Unknown model {composite}")
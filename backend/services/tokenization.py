@@ -0,0 +1,85 @@
+import copy
+import threading
+from models.models_registry import MODEL_REGISTRY
+import logging
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE_MAP = {
+    "hr": "hr_HR",
+    "en": "en_XX",
+    "es": "es_XX",
+    "de": "de_DE",
+    "fr": "fr_XX",
+    "nl": "nl_XX",
+    "it": "it_IT",
+}
+
+# Language codes known to the m2m100 tokenizer.
+M2M100_LANGUAGES = set(
+    "af am ar ast az ba be bg bn br bs ca ceb cs cy da de el en es et fa ff fi fr fy ga gd gl "
+    "gu ha he hi hr ht hu hy id ig ilo is it ja jv ka kk km kn ko lb lg ln lo lt lv mg mk ml mn "
+    "mr ms my ne nl no ns oc or pa pl ps pt ro ru sd si sk sl so sq sr ss su sv sw ta th tl tn "
+    "tr uk ur uz vi wo xh yi yo zh zu".split())
+
+_POOL_LOCK = threading.Lock()
+
+
+def model_lang_code(model_name, lang):
+    if model_name == "facebook/mbart-large-50-many-to-many-mmt":
+        code = LANGUAGE_MAP.get(lang)
+    elif model_name == "facebook/m2m100_1.2B":
+        code = lang if lang in M2M100_LANGUAGES else None
+    else:
+        raise ValueError(f"Unsupported model: {model_name}")
+
+    if not code:
+        raise ValueError(f"Unsupported language for {model_name}: {lang}")
+    return code
+
+
+def _get_entry(model_name, backend):
+    entry = MODEL_REGISTRY.get(model_name, backend=backend)
+    if not entry:
+        raise ValueError(f"Unsupported model: {model_name}")
+    return entry
+
+
+def _get_tokenizer(model_name, src_lang, backend):
+    # Each source language gets its own tokenizer copy, so src_lang is never
+    # changed on a tokenizer another thread may be using.
+    entry = _get_entry(model_name, backend)
+    code = model_lang_code(model_name, src_lang)
+
+    with _POOL_LOCK:
+        pool = entry.setdefault("tokenizers", {})
+        pooled = pool.get(code)
+        if pooled is None:
+            logger.info(f"Creating tokenizer for {model_name} ({code})")
+            tokenizer = copy.deepcopy(entry["tokenizer"])
+            tokenizer.src_lang = code
+            pooled = (tokenizer, threading.Lock())
+            pool[code] = pooled
+    return pooled
+
+
+def encode(model_name, texts, src_lang, backend="torch"):
+    tokenizer, lock = _get_tokenizer(model_name, src_lang, backend)
+    with lock:
+        return tokenizer(texts, return_tensors="pt",
+                         padding=True, truncation=False)
+
+
+def decode(model_name, generated_tokens, src_lang, backend="torch"):
+    tokenizer, lock = _get_tokenizer(model_name, src_lang, backend)
+    with lock:
+        return [tokenizer.decode(t, skip_special_tokens=True) for t in generated_tokens]
+
+
+def target_lang_id(model_name, tgt_lang, backend="torch"):
+    tokenizer = _get_entry(model_name, backend)["tokenizer"]
+    code = model_lang_code(model_name, tgt_lang)
+
+    if model_name == "facebook/mbart-large-50-many-to-many-mmt":
+        return tokenizer.lang_code_to_id[code]
+    return tokenizer.get_lang_id(code)
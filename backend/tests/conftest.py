@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Tests import the backend modules the same way app.py does.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The LLM clients are created at import time; tests never call them.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+# utils.cache_store reads CACHE_PATH on import, possibly before any fixture
+# runs; keep the app's response cache out of backend/cache.
+os.environ["CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="translator-tests-"), "cache.sqlite3")
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    for module in ("flask_cors", "easyocr", "fasttext", "speech_recognition", "jwt"):
+        pytest.importorskip(module)
+    if not os.path.exists(os.path.join(BACKEND_DIR, "models", "lid.176.bin")):
+        pytest.skip("app.py needs models/lid.176.bin")
+
+    # app.py keeps uploads under relative paths.
+    workdir = tmp_path_factory.mktemp("app")
+    previous = os.getcwd()
+    patched = {"AUTH_MODE": "test", "IMAGE_WORKERS": "0"}
+    saved = {key: os.environ.get(key) for key in patched}
+    os.environ.update(patched)
+    os.chdir(workdir)
+    try:
+        import app
+        yield app
+    finally:
+        os.chdir(previous)
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@pytest.fixture
+def client(app_module):
+    from auth import issue_test_token
+    client = app_module.app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {issue_test_token()}"
+    return client
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("speech_recognition")
+
+from services import asr
+
+SAMPLE_RATE = 16000
+
+
+def pcm(*parts):
+    samples = np.concatenate(parts)
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def tone(seconds, dbfs):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return np.sin(2 * np.pi * 220 * t) * 10 ** (dbfs / 20)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE))
+
+
+def test_split_on_silence_cuts_at_pauses():
+    ranges = asr.split_on_silence(pcm(tone(1, -6), silence(1), tone(1, -6)), SAMPLE_RATE)
+    assert len(ranges) == 2
+    assert ranges[0][0] == 0 and ranges[0][1] < 1.1 * SAMPLE_RATE
+    assert 1.9 * SAMPLE_RATE < ranges[1][0] and ranges[1][1] == 3 * SAMPLE_RATE
+
+
+def test_split_on_silence_finds_quiet_speech():
+    noise = np.random.default_rng(0).normal(0, 10 ** (-75 / 20), 3 * SAMPLE_RATE)
+    audio = np.concatenate([tone(1, -50), silence(1), tone(1, -50)]) + noise
+    assert len(asr.split_on_silence(pcm(audio), SAMPLE_RATE)) == 2
+
+
+def test_split_on_silence_keeps_segments_short(monkeypatch):
+    monkeypatch.setattr(asr, "ASR_MAX_SEGMENT_S", 1.0)
+    ranges = asr.split_on_silence(pcm(tone(3.5, -6)), SAMPLE_RATE)
+    assert len(ranges) == 4
+    assert all(end - start <= 1.02 * SAMPLE_RATE for start, end in ranges)
+
+
+def test_split_on_silence_falls_back_to_the_whole_recording():
+    assert asr.split_on_silence(pcm(silence(2)), SAMPLE_RATE) == [(0, 2 * SAMPLE_RATE)]
+    assert asr.split_on_silence(b"", SAMPLE_RATE) == []
+
+
+def test_get_asr_engine():
+    assert isinstance(asr.get_asr_engine("google"), asr.GoogleAsrEngine)
+    whisper = asr.get_asr_engine("whisper_:_tiny")
+    assert isinstance(whisper, asr.WhisperAsrEngine)
+    assert whisper.model_name == "tiny" and whisper.name == "whisper_:_tiny"
+    assert asr.get_asr_engine("whisper").model_name == asr.ASR_WHISPER_MODEL
+    with pytest.raises(ValueError):
+        asr.get_asr_engine("bogus")
+
+
+class EchoEngine:
+    name = "echo"
+
+    def transcribe(self, pcm, sample_rate, language):
+        return f"{language}:{len(pcm) // 2}"
+
+
+def test_transcribe_joins_segments_in_order():
+    audio = pcm(tone(1, -6), silence(1), tone(0.5, -6))
+    ranges = asr.split_on_silence(audio, SAMPLE_RATE)
+    expected = " ".join(f"hr:{end - start}" for start, end in ranges)
+    assert asr.transcribe(EchoEngine(), audio, SAMPLE_RATE, "hr") == expected
+
+
+def test_transcribe_raises_when_nothing_is_understood():
+    class SilentEngine:
+        def transcribe(self, pcm, sample_rate, language):
+            return ""
+
+    with pytest.raises(asr.SpeechRecognitionError):
+        asr.transcribe(SilentEngine(), pcm(tone(1, -6)), SAMPLE_RATE, "hr")
@@ -0,0 +1,9 @@
+import pytest
+from services import audio_decode
+from services.audio_decode import AudioDecodeError, decode_audio
+
+
+def test_missing_ffmpeg_is_a_decode_error(monkeypatch):
+    monkeypatch.setattr(audio_decode, "FFMPEG_BINARY", "/nonexistent/ffmpeg")
+    with pytest.raises(AudioDecodeError, match="Could not run /nonexistent/ffmpeg"):
+        decode_audio(b"RIFF")
@@ -0,0 +1,61 @@
+import io
+import json
+import pytest
+
+
+@pytest.fixture
+def stream(app_module, monkeypatch):
+    state = {"segments": [], "translated": []}
+
+    def transcripts(audio_bytes, src_lang, asr_engine=None):
+        for index, text in enumerate(state["segments"]):
+            yield {"index": index, "start": index, "end": index + 1, "text": text}
+
+    def translate(text, *args):
+        state["translated"].append(text)
+        return text.upper()
+
+    # Stand-in language detector: anything mentioning "hello" is English.
+    monkeypatch.setattr(app_module, "stream_audio_transcripts", transcripts)
+    monkeypatch.setattr(app_module, "translate_audio_file", translate)
+    monkeypatch.setattr(app_module, "get_lang", lambda text: "en" if "hello" in text else "hr")
+    return state
+
+
+def post(client, audio, **fields):
+    response = client.post("/translate-audio/stream", content_type="multipart/form-data", data={
+        "file": (io.BytesIO(audio), "speech.wav"), "src_lang": "hr", "tgt_lang": "en", **fields})
+    return [json.loads(line[6:]) for line in response.get_data(as_text=True).splitlines()
+            if line.startswith("data: ")]
+
+
+def test_short_first_segment_does_not_decide_the_language(client, stream):
+    stream["segments"] = ["da", "ovo je dulji tekst na hrvatskom jeziku", "i još malo"]
+    events = post(client, b"stream-1")
+    assert [event.get("translation") for event in events[:-1]] == [
+        "DA", "OVO JE DULJI TEKST NA HRVATSKOM JEZIKU", "I JOŠ MALO"]
+    assert events[-1]["detected_lang"] == "hr" and events[-1]["done"]
+
+
+def test_wrong_language_is_not_translated(client, stream):
+    stream["segments"] = ["hello there, this recording is in english", "and more of it"]
+    events = post(client, b"stream-2")
+    assert events == [{"translation": "", "detected_lang": "en", "done": True}]
+    assert stream["translated"] == []
+
+
+def test_force_translates_every_segment(client, stream):
+    stream["segments"] = ["hello", "there"]
+    events = post(client, b"stream-3", force="1")
+    assert [event.get("translation") for event in events[:-1]] == ["HELLO", "THERE"]
+    assert events[-1]["detected_lang"] == "en"
+
+
+def test_unexpected_failure_ends_with_an_error_event(app_module, client, stream, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(app_module, "translate_audio_file", broken)
+    stream["segments"] = ["ovo je dulji tekst na hrvatskom jeziku, stvarno"]
+    events = post(client, b"stream-4")
+    assert events == [{"error": "Internal server error: model crashed", "status": 500}]
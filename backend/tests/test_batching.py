@@ -0,0 +1,34 @@
+import threading
+import pytest
+
+from services import batching
+from services.text_translate import ml_translate
+
+
+def batcher_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("batcher-")]
+
+
+def test_unsupported_languages_start_no_batcher():
+    before = len(batcher_threads())
+    for i in range(20):
+        with pytest.raises(ValueError):
+            ml_translate(["Dobar dan."], f"bogus{i}", "en", "facebook/m2m100_1.2B", profile="fast")
+        with pytest.raises(ValueError):
+            ml_translate(["Dobar dan."], "hr", f"bogus{i}", "facebook/mbart-large-50-many-to-many-mmt")
+    assert len(batcher_threads()) == before
+
+
+def test_idle_batcher_stops_and_is_replaced(monkeypatch):
+    monkeypatch.setattr(batching, "BATCH_IDLE_S", 0.05)
+    key = ("test", "idle")
+    run_batch = lambda texts: [text.upper() for text in texts]
+
+    assert batching.submit_batched(key, run_batch, ["a"]) == ["A"]
+    first = batching._BATCHERS[key]
+    first._thread.join(timeout=2)
+    assert not first._thread.is_alive()
+    assert key not in batching._BATCHERS
+
+    assert batching.submit_batched(key, run_batch, ["b"]) == ["B"]
+    assert batching._BATCHERS[key] is not first
@@ -0,0 +1,35 @@
+import time
+import utils.cache_store as cache_store
+from utils.cache_store import SqliteCache
+
+
+def accessed_at(cache, key):
+    return cache._connection().execute(
+        "SELECT accessed_at FROM entries WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_only_touch_entries_that_were_not_read_recently(tmp_path, monkeypatch):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("key", {"translation": "hello"}, timeout=60)
+    written = accessed_at(cache, "key")
+
+    changes = cache._connection().total_changes
+    assert cache.get("key") == {"translation": "hello"}
+    assert cache._connection().total_changes == changes
+    assert accessed_at(cache, "key") == written
+
+    monkeypatch.setattr(cache_store, "CACHE_TOUCH_INTERVAL", 0)
+    time.sleep(0.01)
+    assert cache.get("key") == {"translation": "hello"}
+    assert accessed_at(cache, "key") > written
+    assert cache.stats()["hits"] == 2
+
+
+def test_database_errors_are_misses(tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("key", {"translation": "hello"}, timeout=60)
+    cache._connection().execute("DROP TABLE entries")
+
+    cache.set("other", {"translation": "bye"}, timeout=60)
+    assert cache.get("key") is None
+    assert cache.misses == 1
@@ -0,0 +1,92 @@
+import io
+import os
+import time
+import pytest
+from PIL import Image
+
+class Counter:
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.fn(*args, **kwargs)
+
+
+@pytest.fixture
+def counters(app_module, monkeypatch):
+    from services import audio_translate, image_translate
+    from services.ocr import OcrResult
+
+    ocr = Counter(lambda image: OcrResult([("Dobar dan", (10, 10, 120, 30), 0.9)]))
+    lines = Counter(lambda texts, *args: [text.upper() for text in texts])
+    speech = Counter(lambda audio_bytes, src_lang, asr_engine=None: "dobar dan")
+    text = Counter(lambda text, *args: text.upper())
+
+    monkeypatch.setattr(app_module.IMAGE_POOL, "ocr", ocr)
+    monkeypatch.setattr(image_translate, "translate_lines", lines)
+    monkeypatch.setattr(app_module, "extract_text_from_audio", speech)
+    monkeypatch.setattr(audio_translate, "translate_input_text", text)
+    return {"ocr": ocr, "lines": lines, "speech": speech, "text": text}
+
+
+def image_upload(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 60), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def post_twice(client, path, make_data, counters):
+    first = client.post(path, data=make_data(), content_type="multipart/form-data")
+    calls = {name: counter.calls for name, counter in counters.items()}
+    second = client.post(path, data=make_data(), content_type="multipart/form-data")
+    return first, second, calls
+
+
+def test_repeat_image_upload_skips_the_pipeline(client, counters):
+    image_bytes = image_upload("white")
+    first, second, calls = post_twice(client, "/translate-image", lambda: {
+        "file": (io.BytesIO(image_bytes), "sign.png"), "src_lang": "hr", "tgt_lang": "en",
+        "composite": "ml_:_facebook/m2m100_1.2B", "format": "png"}, counters)
+
+    assert first.status_code == 200, first.get_json()
+    assert calls["ocr"] == 1 and calls["lines"] == 1
+    assert second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert {name: counter.calls for name, counter in counters.items()} == calls
+
+
+def test_repeat_audio_upload_skips_the_pipeline(client, counters):
+    audio_bytes = b"RIFF" + os.urandom(64)
+    first, second, calls = post_twice(client, "/translate-audio", lambda: {
+        "file": (io.BytesIO(audio_bytes), "speech.wav"), "src_lang": "hr", "tgt_lang": "en",
+        "composite": "ml_:_facebook/m2m100_1.2B", "force": "1"}, counters)
+
+    assert first.status_code == 200, first.get_json()
+    assert calls["speech"] == 1 and calls["text"] == 1
+    assert second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert {name: counter.calls for name, counter in counters.items()} == calls
+
+
+def test_async_repeat_upload_is_answered_as_a_job(client, counters):
+    image_bytes = image_upload("gray")
+
+    def data(**extra):
+        return {"file": (io.BytesIO(image_bytes), "sign.png"), "src_lang": "hr", "tgt_lang": "en",
+                "composite": "ml_:_facebook/m2m100_1.2B", "format": "png", **extra}
+
+    first = client.post("/translate-image", data=data(), content_type="multipart/form-data")
+    second = client.post("/translate-image", data=data(**{"async": "1"}),
+                         content_type="multipart/form-data")
+
+    assert second.status_code == 202
+    job_id = second.get_json()["job_id"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").get_json()
+        if job["status"] == "done":
+            break
+        time.sleep(0.01)
+    assert job["result"] == first.get_json()
+    assert counters["ocr"].calls == 1
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/translate-text", "/translate-text/stream"])
+def test_unknown_composite_is_a_bad_request(client, path):
+    response = client.post(path, json={"text": "dobar dan", "composite": "bogus"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown model bogus"}
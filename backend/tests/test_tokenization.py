@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from models.models_registry import MODEL_REGISTRY
+from services import tokenization
+from services.text_translate import ml_translate
+
+MODEL_NAME = "facebook/m2m100_1.2B"
+LANGUAGES = ["hr", "en", "de", "fr", "es", "it", "nl"]
+
+# Module level, so the per-language deep copies of the tokenizer share them.
+LANG_IDS = {lang: i for i, lang in enumerate(LANGUAGES)}
+WORDS = []
+WORD_IDS = {}
+WORDS_LOCK = threading.Lock()
+
+
+def word_id(text):
+    with WORDS_LOCK:
+        if text not in WORD_IDS:
+            WORD_IDS[text] = len(WORDS)
+            WORDS.append(text)
+        return WORD_IDS[text]
+
+
+class StubTokenizer:
+    # Encodes every text as [source language, text], reading src_lang once
+    # and yielding in between, so a src_lang changed by another thread shows up.
+    def __init__(self):
+        self.src_lang = None
+
+    def __call__(self, texts, **kwargs):
+        ids = []
+        for text in texts:
+            lang = self.src_lang
+            time.sleep(0)
+            ids.append([LANG_IDS[lang], word_id(text)])
+        return {"input_ids": torch.tensor(ids), "attention_mask": torch.ones(len(ids), 2)}
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return f"{LANGUAGES[int(tokens[0])]}:{WORDS[int(tokens[1])]}"
+
+    def get_lang_id(self, code):
+        return LANG_IDS[code]
+
+
+class StubModel:
+    class config:
+        name_or_path = MODEL_NAME
+
+    def generate(self, input_ids, attention_mask, forced_bos_token_id, **kwargs):
+        time.sleep(0.001)
+        return input_ids
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    entry = {"tokenizer": StubTokenizer(), "model": StubModel(), "backend": "torch",
+             "precision": "fp32", "memory_bytes": 0}
+    monkeypatch.setitem(MODEL_REGISTRY._entries, (MODEL_NAME, "torch"), entry)
+    return entry
+
+
+def run_callers(fn, callers=64, calls=20):
+    def caller(n):
+        lang = LANGUAGES[n % len(LANGUAGES)]
+        return [(lang, texts, fn(lang, texts))
+                for texts in ([f"caller {n} call {i}", f"line {i}"] for i in range(calls))]
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        return [result for results in pool.map(caller, range(callers)) for result in results]
+
+
+def test_encode_keeps_each_callers_language(stub_model):
+    def encode(lang, texts):
+        inputs = tokenization.encode(MODEL_NAME, texts, lang)
+        return tokenization.decode(MODEL_NAME, inputs["input_ids"], lang)
+
+    for lang, texts, decoded in run_callers(encode):
+        assert decoded == [f"{lang}:{text}" for text in texts]
+
+    assert set(stub_model["tokenizers"]) == set(LANGUAGES)
+    assert stub_model["tokenizer"].src_lang is None
+
+
+def test_ml_translate_keeps_each_callers_language(stub_model):
+    def translate(lang, texts):
+        return ml_translate(texts, lang, "en", MODEL_NAME, profile="fast")
+
+    for lang, texts, translated in run_callers(translate):
+        assert translated == [f"{lang}:{text}" for text in texts]
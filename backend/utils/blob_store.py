@@ -0,0 +1,146 @@
+import os
+import re
+import threading
+import time
+import uuid
+import logging
+from utils.hashers import generate_hash
+
+logger = logging.getLogger(__name__)
+
+STORAGE_MAX_AGE = float(os.getenv("STORAGE_MAX_AGE_HOURS", "24")) * 3600
+STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_MB", "2048")) * 1024 * 1024
+STORAGE_SWEEP_INTERVAL = int(os.getenv("STORAGE_SWEEP_INTERVAL", "600"))
+
+BLOB_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{40}\.[a-z0-9]{1,10}$")
+
+
+def blob_extension(filename, default="bin"):
+    ext = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    return ext if re.fullmatch(r"[a-z0-9]{1,10}", ext) else default
+
+
+class BlobStore:
+    # Files are stored once under their content hash ("ab/abcd....webp"), so
+    # identical uploads and results share one file and names never collide.
+    def __init__(self, root, max_age=STORAGE_MAX_AGE, max_bytes=STORAGE_MAX_BYTES):
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self.writes = 0
+        self.dedup_hits = 0
+        self.swept = 0
+        self.last_sweep = None
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def exists(self, name):
+        return bool(BLOB_NAME.match(name)) and os.path.isfile(self.path(name))
+
+    def touch(self, name):
+        # mtime doubles as last access time for the sweeper.
+        try:
+            os.utime(self.path(name))
+        except OSError:
+            pass
+
+    def put(self, data, ext, digest=None):
+        digest = digest or generate_hash(data)
+        name = f"{digest[:2]}/{digest}.{ext}"
+        path = self.path(name)
+        if os.path.exists(path):
+            self.touch(name)
+            with self._lock:
+                self.dedup_hits += 1
+            return name
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write under a temporary name and rename, so a concurrent reader or
+        # writer of the same blob never sees a partial file.
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.writes += 1
+        return name
+
+    def _files(self):
+        files = []
+        for root, _, names in os.walk(self.root):
+            for fname in names:
+                path = os.path.join(root, fname)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def sweep(self):
+        now = time.time()
+        files = self._files()
+        removed = 0
+        kept = []
+        for mtime, size, path in files:
+            if now - mtime > self.max_age:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        if self.max_bytes and total > self.max_bytes:
+            # Oldest first until back under 90% of the cap.
+            target = total - int(self.max_bytes * 0.9)
+            for mtime, size, path in sorted(kept):
+                if target <= 0:
+                    break
+                removed += self._remove(path)
+                target -= size
+
+        with self._lock:
+            self.swept += removed
+            self.last_sweep = now
+        if removed:
+            logger.info(f"Swept {removed} files from {self.root}")
+        return removed
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError as e:
+            logger.warning(f"Failed to remove {path}: {e}")
+            return 0
+
+    def start_sweeper(self, interval=STORAGE_SWEEP_INTERVAL):
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(
+                    target=self._sweep_loop, args=(interval,),
+                    name=f"sweeper-{os.path.basename(self.root)}", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self, interval):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"Sweeping {self.root} failed: {e}")
+            time.sleep(interval)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "root": self.root,
+                "writes": self.writes,
+                "dedup_hits": self.dedup_hits,
+                "swept": self.swept,
+                "last_sweep": self.last_sweep,
+                "max_age_s": self.max_age,
+                "max_bytes": self.max_bytes,
+            }
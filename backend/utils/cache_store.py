@@ -0,0 +1,221 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+UTILS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(UTILS_DIR)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(
+    BACKEND_DIR, "cache", "translations.sqlite3"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_MB", "512")) * 1024 * 1024
+# Size checks scan the whole table, so they run only after this many seconds
+# or once 1% of the cap has been written since the last one.
+CACHE_EVICT_INTERVAL = float(os.getenv("CACHE_EVICT_INTERVAL", "60"))
+# A hit only rewrites accessed_at when the stored one is older than this, so
+# repeated reads of a hot entry stay reads; LRU order is kept to this precision.
+CACHE_TOUCH_INTERVAL = float(os.getenv("CACHE_TOUCH_INTERVAL", "60"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+CACHE_TTL = {
+    "text": int(os.getenv("CACHE_TTL_TEXT", "86400")),
+    "image": int(os.getenv("CACHE_TTL_IMAGE", "3600")),
+    "audio": int(os.getenv("CACHE_TTL_AUDIO", "3600")),
+}
+
+
+class SqliteCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._inherited = []
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._written = 0
+        self._checked_at = time.time()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Closed right away, so a gunicorn --preload parent holds no
+        # connection that its forked workers could inherit.
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self):
+        # One connection per thread and process; WAL lets gunicorn workers on
+        # the same node read while another one writes.
+        pid, conn = getattr(self._local, "conn", (None, None))
+        if pid != os.getpid():
+            if conn is not None:
+                # Opened before a fork. Closing it here could release locks the
+                # parent still holds, so it is only kept from being collected.
+                self._inherited.append(conn)
+            conn = self._connect()
+            self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key):
+        try:
+            return self._get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed, treating it as a miss: {e}")
+            self._count("misses")
+            return None
+
+    def _get(self, key):
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+
+        value, expires_at, accessed_at = row
+        if expires_at <= now:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+
+        if now - accessed_at >= CACHE_TOUCH_INTERVAL:
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(value)
+
+    def set(self, key, value, timeout):
+        try:
+            self._set(key, value, timeout)
+        except sqlite3.Error as e:
+            # The response is still served; it just is not cached.
+            logger.warning(f"Cache write failed, skipping it: {e}")
+
+    def _set(self, key, value, timeout):
+        now = time.time()
+        payload = json.dumps(value).encode("utf-8")
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload), now + timeout, now))
+
+        with self._stats_lock:
+            self._written += len(payload)
+            due = (self._written >= self.max_bytes // 100
+                   or now - self._checked_at >= CACHE_EVICT_INTERVAL)
+            if due:
+                self._written = 0
+                self._checked_at = now
+        if due:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+            total = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                # Drop least recently used entries until back under 90% of the cap.
+                target = total - int(self.max_bytes * 0.9)
+                rows = conn.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+                for key, size in rows:
+                    if target <= 0:
+                        break
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    target -= size
+                    evicted += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if expired or evicted:
+            self._count("evictions", expired + evicted)
+
+    def stats(self):
+        entries, stored = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._stats_lock:
+            return {
+                "backend": "sqlite",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes_stored": stored,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class RedisCache:
+    def __init__(self, url=CACHE_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("CACHE_BACKEND=redis requires the redis package.")
+        self.client = redis.Redis.from_url(url)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value, timeout):
+        self.client.set(key, json.dumps(value), ex=timeout)
+
+    def stats(self):
+        info = self.client.info()
+        with self._stats_lock:
+            return {
+                "backend": "redis",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": info.get("evicted_keys", 0) + info.get("expired_keys", 0),
+                "entries": self.client.dbsize(),
+                "bytes_stored": info.get("used_memory", 0),
+            }
+
+
+def get_cache(backend=CACHE_BACKEND):
+    logger.info(f"Using {backend} translation cache")
+    if backend == "sqlite":
+        return SqliteCache()
+    if backend == "redis":
+        return RedisCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
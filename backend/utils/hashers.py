@@ -1,19 +1,59 @@
 import hashlib
+from io import BytesIO
+
+CHUNK_SIZE = 64 * 1024
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=20)
 
 
 def generate_hash(data):
-    return hashlib.md5(data).hexdigest()
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def hash_stream(stream, sink=None, chunk_size=CHUNK_SIZE):
+    hasher = new_hasher()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
+    return hasher.hexdigest()
+
+
+def read_upload(file):
+    # Hash the upload chunk by chunk while it is copied into memory, so the
+    # bytes are never read a second time just to build the cache key.
+    buffer = BytesIO()
+    digest = hash_stream(file.stream, buffer)
+    return buffer.getvalue(), digest
+
+
+def cache_model_id(engine, model_name, backend=None, profile=None):
+    model_id = f"{engine}-{model_name.split('/')[-1]}"
+    if backend and backend != "torch":
+        model_id = f"{model_id}-{backend}"
+    if engine == "ml" and profile:
+        model_id = f"{model_id}-{profile}"
+    return model_id
+
+
+def _cache_key(kind, src_lang, tgt_lang, model_id, digest):
+    return f"{kind}_{src_lang}_{tgt_lang}_{model_id}_{digest}"
 
 
-def generate_text_cache_key(text, src_lang, tgt_lang, model_name):
-    return f"text_{src_lang}_{tgt_lang}_{model_name}_{hashlib.md5(text.encode("utf-8")).hexdigest()}"
+def generate_text_cache_key(text, src_lang, tgt_lang, model_id):
+    return _cache_key("text", src_lang, tgt_lang, model_id, generate_hash(text.strip().encode("utf-8")))
 
 
-def generate_image_cache_key(image_bytes, src_lang, tgt_lang, model_name):
-    with open(image_bytes, "rb") as f:
-        return f"image_{src_lang}_{tgt_lang}_{model_name}_{hashlib.sha256(f.read()).hexdigest()}"
+def generate_image_cache_key(image_digest, src_lang, tgt_lang, model_id):
+    return _cache_key("image", src_lang, tgt_lang, model_id, image_digest)
 
 
-def generate_audio_cache_key(audio_bytes, src_lang, tgt_lang, model_name):
-    with open(audio_bytes, "rb") as f:
-        return f"audio_{src_lang}_{tgt_lang}_{model_name}_{hashlib.sha256(f.read()).hexdigest()}"
+def generate_audio_cache_key(audio_digest, src_lang, tgt_lang, model_id):
+    return _cache_key("audio", src_lang, tgt_lang, model_id, audio_digest)
@@ -1,7 +1,6 @@
 import re
 import os
 import fasttext
-import pytesseract
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,13 +44,10 @@ def get_lang(text):
     return get_parent_language(lang, PARENT_LANGS)
 
 
-def image_lang_detector(image):
-    data = pytesseract.image_to_data(
-        image, output_type=pytesseract.Output.DICT)
-    image_text_list = [word for word in data["text"] if word.strip()]
-    if not image_text_list:
+def image_lang_detector(ocr_result):
+    full_text = ocr_result.text()
+    if not full_text.strip():
         raise ValueError("No text detected in the image.")
-    full_text = " ".join(image_text_list)
     detected_lang = get_lang(full_text)
     logger.info(
         f"Detected image language: {detected_lang}\nImage text: {full_text}\n")